@@ -4,33 +4,60 @@ Akash Network collector for Pulse Atlas
 Auto-fetches events from:
 - GitHub releases (akash-network)
 - RSS/Atom feeds (optional)
-Stores normalized events into sqlite signals table via storage.save_signal()
+Stores normalized events into sqlite signals table via storage.save_signals_many()
 """
 
 import os
 import json
 import time
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from urllib.request import Request, urlopen
 from urllib.error import URLError, HTTPError
 
-from storage import init_db, save_signal
+import storage
+from storage import connect_db, init_db, save_signals_many
 
-DB_PATH = os.getenv("ATLAS_DB_PATH", "data/atlas.db")
+# сигналы и курсоры пишутся одним соединением, в одну БД
+DB_PATH = os.getenv("ATLAS_DB_PATH", str(storage.DB_PATH))
 
 GITHUB_API = "https://api.github.com"
 REPO = "akash-network/node"   # основной репозиторий (можно расширить позже)
+REPOS = [REPO]                 # все репозитории, релизы качаются параллельно
+MAX_WORKERS = 8                # не больше 8 одновременных запросов к GitHub API
 USER_AGENT = "pulse-atlas/0.1 (+collector; akash)"
+MAX_BODY = 4000                # дальше 4000 символов body нигде не используется
 
 
-def http_get_json(url: str, token: str | None = None, timeout: int = 20):
+NOT_MODIFIED = object()  # sentinel: GitHub ответил 304, тело не пришло
+
+
+def _truncate_body(d: dict) -> dict:
+    body = d.get("body")
+    if isinstance(body, str) and len(body) > MAX_BODY:
+        d["body"] = body[:MAX_BODY]
+    return d
+
+
+def http_get_json(url: str, token: str | None = None, timeout: int = 20, etag: str | None = None):
+    """GET JSON with an optional If-None-Match; returns (data | NOT_MODIFIED, etag)."""
     headers = {"User-Agent": USER_AGENT, "Accept": "application/vnd.github+json"}
     if token:
         headers["Authorization"] = f"Bearer {token}"
+    if etag:
+        headers["If-None-Match"] = etag
     req = Request(url, headers=headers)
-    with urlopen(req, timeout=timeout) as r:
-        return json.loads(r.read().decode("utf-8"))
+    try:
+        with urlopen(req, timeout=timeout) as r:
+            # json.load по байтовому потоку: без промежуточной decode()-копии,
+            # длинные changelog-и режутся прямо во время разбора
+            return json.load(r, object_hook=_truncate_body), r.headers.get("ETag")
+    except HTTPError as e:
+        # 304 не тратит primary rate limit GitHub
+        if e.code == 304:
+            return NOT_MODIFIED, etag
+        raise
 
 
 def get_last_seen(conn: sqlite3.Connection, source: str) -> str | None:
@@ -48,7 +75,6 @@ def set_last_seen(conn: sqlite3.Connection, source: str, cursor: str):
         "ON CONFLICT(source) DO UPDATE SET cursor=excluded.cursor, updated_at=excluded.updated_at",
         (source, cursor, datetime.now(timezone.utc).isoformat()),
     )
-    conn.commit()
 
 
 def normalize_release(rel: dict) -> dict:
@@ -58,22 +84,42 @@ def normalize_release(rel: dict) -> dict:
         "title": rel.get("name") or rel.get("tag_name"),
         "url": rel.get("html_url"),
         "ts": published_at,
-        "body": (rel.get("body") or "")[:4000],
+        "body": (rel.get("body") or "")[:MAX_BODY],
         "tag": rel.get("tag_name"),
         "prerelease": bool(rel.get("prerelease")),
         "draft": bool(rel.get("draft")),
     }
 
 
-def fetch_github_releases():
+def fetch_github_releases(repos: list[str] | None = None, etags: dict[str, str | None] | None = None) -> dict[str, tuple]:
+    """Fetch releases for every repo concurrently: total latency ~ max(RTT), not sum."""
     token = os.getenv("GITHUB_TOKEN")
-    url = f"{GITHUB_API}/repos/{REPO}/releases?per_page=10"
-    return http_get_json(url, token=token)
+    repos = repos or REPOS
+    etags = etags or {}
+
+    def fetch(repo: str):
+        url = f"{GITHUB_API}/repos/{repo}/releases?per_page=10"
+        return http_get_json(url, token=token, etag=etags.get(repo))
 
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(repos))) as ex:
+        return dict(zip(repos, ex.map(fetch, repos)))
 
-def store_event(event: dict, raw: dict, source: str):
-    """Store normalized event row into signals table via save_signal()."""
-    payload = {
+
+def cursor_source(repo: str) -> str:
+    # основной репозиторий сохраняет исторический ключ курсора
+    if repo == REPO:
+        return "akash/github/releases"
+    return f"akash/github/releases:{repo}"
+
+
+def etag_source(repo: str) -> str:
+    # ETag живёт рядом с курсором, отдельной строкой в cursors
+    return cursor_source(repo) + "#etag"
+
+
+def event_payload(event: dict, raw: dict, source: str) -> dict:
+    """Normalized event -> signals row payload for save_signals_many()."""
+    return {
         "ts": event.get("ts"),
         "object": "Akash Network",
         "source": source,              # e.g. "akash/github"
@@ -84,23 +130,13 @@ def store_event(event: dict, raw: dict, source: str):
         "meta": json.dumps({k: event.get(k) for k in ["tag", "prerelease", "draft"] if k in event}, ensure_ascii=False),
         "raw": json.dumps(raw, ensure_ascii=False),
     }
-    save_signal(payload)
 
 
-def main():
-    init_db()
-    conn = sqlite3.connect(DB_PATH)
-
+def process_releases(conn: sqlite3.Connection, repo: str, releases: list, etag: str | None) -> None:
     # 1) GitHub releases cursor
-    source = "akash/github/releases"
+    source = cursor_source(repo)
     last = get_last_seen(conn, source)
 
-    try:
-        releases = fetch_github_releases()
-    except (HTTPError, URLError, TimeoutError) as e:
-        print(f"[akash_fetch] error fetching releases: {e}")
-        return 2
-
     # GitHub returns newest first
     new_items = []
     for rel in releases:
@@ -116,20 +152,49 @@ def main():
         new_items.append((cursor, ev, rel))
 
     if not new_items:
-        print("[akash_fetch] no new releases")
-        return 0
+        print(f"[akash_fetch] no new releases ({repo})")
+        if etag:
+            set_last_seen(conn, etag_source(repo), etag)
+        return
 
     # сохраняем в хронологическом порядке (старые→новые)
     new_items.reverse()
     newest_cursor = new_items[-1][0]
 
+    # один executemany на все новые релизы, в транзакции вызывающего вместе с курсором
+    save_signals_many([event_payload(ev, rel, source="akash/github") for _, ev, rel in new_items], conn)
     for cursor, ev, rel in new_items:
-        store_event(ev, rel, source="akash/github")
         print(f"[akash_fetch] stored: {ev['title']} ({ev.get('tag')})")
 
     set_last_seen(conn, source, newest_cursor)
+    if etag:
+        set_last_seen(conn, etag_source(repo), etag)
     print(f"[akash_fetch] cursor updated: {newest_cursor}")
-    return 0
+
+
+def main():
+    init_db()
+    # autocommit: транзакции открываются явно, BEGIN IMMEDIATE на репозиторий
+    conn = connect_db(DB_PATH, isolation_level=None)
+    try:
+        etags = {repo: get_last_seen(conn, etag_source(repo)) for repo in REPOS}
+        try:
+            releases_by_repo = fetch_github_releases(REPOS, etags)
+        except (HTTPError, URLError, TimeoutError) as e:
+            print(f"[akash_fetch] error fetching releases: {e}")
+            return 2
+
+        for repo, (releases, etag) in releases_by_repo.items():
+            if releases is NOT_MODIFIED:
+                print(f"[akash_fetch] not modified ({repo})")
+                continue
+            # сигналы + курсор + etag репозитория: COMMIT на выходе, ROLLBACK при ошибке
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                process_releases(conn, repo, releases, etag)
+        return 0
+    finally:
+        conn.close()
 
 
 if __name__ == "__main__":
@@ -1,8 +1,14 @@
+import re
 import sqlite3
 from datetime import datetime, timezone
 
 import storage
 
+try:
+    import ahocorasick  # pyahocorasick, optional
+except ImportError:
+    ahocorasick = None
+
 
 RISK_WORDS = {
     "hack", "hacked", "exploit", "breach", "leak", "malware", "ransom",
@@ -15,54 +21,99 @@ HYPE_WORDS = {
     "record", "surge", "breakthrough", "wins", "adoption",
 }
 
+_CATEGORY = {**{w: "hype" for w in HYPE_WORDS}, **{w: "risk" for w in RISK_WORDS}}
+
+# префильтр: если в тексте нет ни одной первой буквы ключевых слов
+# (пустой / кириллический текст) — сразу neutral, без скана
+_FIRST_CHARS = frozenset(w[0] for w in _CATEGORY)
+
+if ahocorasick is not None:
+    _AUTOMATON = ahocorasick.Automaton()
+    for _w in _CATEGORY:
+        _AUTOMATON.add_word(_w, _w)
+    _AUTOMATON.make_automaton()
+
+    def _matched_words(t: str) -> set[str]:
+        return {w for _, w in _AUTOMATON.iter(t)}
+else:
+    # один проход regex вместо ~30 отдельных `w in t`.
+    # lookahead даёт самое длинное слово на каждой позиции; более короткие
+    # слова внутри него (hack ⊂ hacked) добираем через _CONTAINED.
+    _WORDS_RE = re.compile(
+        "(?=({}))".format("|".join(map(re.escape, sorted(_CATEGORY, key=len, reverse=True))))
+    )
+    _CONTAINED = {w: {k for k in _CATEGORY if k in w} for w in _CATEGORY}
+
+    def _matched_words(t: str) -> set[str]:
+        found: set[str] = set()
+        for w in set(_WORDS_RE.findall(t)):
+            found |= _CONTAINED[w]
+        return found
+
+# результаты classify: (score, label, color) + rationale
+_RISK = (0.85, "risk", "🔴")
+_HYPE = (0.70, "hype", "🟢")
+_NEUTRAL = (0.35, "neutral", "⚪", "rule:neutral")
+
 def classify(title: str, text: str):
-    t = f"{title}\n{text}".lower()
+    return classify_pre(f"{title}\n{text}".lower())
+
+def classify_pre(t: str):
+    """classify() для уже склеенного и приведённого к lower текста."""
+    if _FIRST_CHARS.isdisjoint(t):
+        return _NEUTRAL
 
-    risk_hits = sum(1 for w in RISK_WORDS if w in t)
-    hype_hits = sum(1 for w in HYPE_WORDS if w in t)
+    found = _matched_words(t)
+    risk_hits = len(found & RISK_WORDS)
+    hype_hits = len(found) - risk_hits
 
     # базовая, прозрачная логика (позже заменим на LLM)
     if risk_hits >= 1 and risk_hits >= hype_hits:
-        return 0.85, "risk", "🔴", f"rule:risk hits={risk_hits}"
+        return (*_RISK, f"rule:risk hits={risk_hits}")
     if hype_hits >= 2 and hype_hits > risk_hits:
-        return 0.70, "hype", "🟢", f"rule:hype hits={hype_hits}"
-    return 0.35, "neutral", "⚪", "rule:neutral"
+        return (*_HYPE, f"rule:hype hits={hype_hits}")
+    return _NEUTRAL
 
 def run(limit: int = 200):
     storage.init_db()
     conn = sqlite3.connect(storage.DB_PATH)
-    cur = conn.cursor()
-
-    cur.execute(
-        """
-        SELECT id, COALESCE(title,''), COALESCE(text,''), COALESCE(url,'')
-        FROM signals
-        WHERE source='rss' AND (rationale IS NULL OR rationale='')
-        ORDER BY id DESC
-        LIMIT ?
-        """,
-        (limit,),
-    )
-    rows = cur.fetchall()
-
-    updated = 0
-    for _id, title, text, url in rows:
-        score, label, color, rationale = classify(title, text)
-        if url:
-            rationale = f"{rationale}; url={url}"
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
 
-        cur.execute(
+        rows = conn.execute(
             """
-            UPDATE signals
-            SET score=?, label=?, color=?, rationale=?
-            WHERE id=?
+            SELECT id, LOWER(COALESCE(title,'') || char(10) || COALESCE(text,'')), COALESCE(url,'')
+            FROM signals
+            WHERE source='rss' AND (rationale IS NULL OR rationale='')
+            ORDER BY id DESC
+            LIMIT ?
             """,
-            (float(score), label, color, rationale, _id),
-        )
-        updated += 1
+            (limit,),
+        ).fetchall()
+
+        updates = []
+        # LOWER + склейка уже в SQL; ключевые слова ASCII, так что LOWER достаточно
+        for _id, t, url in rows:
+            score, label, color, rationale = classify_pre(t)
+            if url:
+                rationale += "; url=" + url
+            updates.append((float(score), label, color, rationale, _id))
 
-    conn.commit()
-    conn.close()
+        # один транзакционный батч вместо UPDATE+journal на каждую строку;
+        # with conn: COMMIT на выходе, ROLLBACK при исключении
+        with conn:
+            conn.executemany(
+                """
+                UPDATE signals
+                SET score=?, label=?, color=?, rationale=?
+                WHERE id=?
+                """,
+                updates,
+            )
+        updated = len(updates)
+    finally:
+        conn.close()
 
     ts = datetime.now(timezone.utc).isoformat()
     print(f"[analyze] {ts} updated={updated}")
@@ -5,15 +5,28 @@ import argparse
 import os
 import re
 import shutil
-import sqlite3
 import subprocess
 import sys
 import time
 from dataclasses import dataclass
+from importlib.metadata import PackageNotFoundError, version
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import sqlite3
 
 TS = time.strftime("%Y%m%d_%H%M%S")
 
+# patterns used by the patchers, compiled once
+_RUN_BLOCK_RE = re.compile(r"def run\(cmd\):\n(?:(?:    .*\n)|\n)+")
+_RUN_PY_CALL_RE = re.compile(r"run\(\[py,\s*\"([^\"]+\.py)\"\]\)")
+_IMPORTS_BLOCK_RE = re.compile(r'^(?:import .+\n|from .+ import .+\n)+\n', flags=re.M)
+# one alternation for all dashboard rewrites: a single scan of the source
+_DASHBOARD_PATCH_RE = re.compile(
+    r"(use_container_width=True)|(use_container_width=False)|st\.dataframe\(\s*([A-Za-z_]\w*)\s*,"
+)
+
 @dataclass
 class CheckResult:
     ok: bool
@@ -36,6 +49,14 @@ def backup_file(p: Path) -> Path:
     shutil.copy2(p, bak)
     return bak
 
+def write_patched(p: Path, original: str, patched: str) -> Path:
+    """Write patched text; the backup is made from the already-read original (no re-read)."""
+    bak = p.with_name(f"{p.name}.bak.{TS}")
+    bak.write_text(original, encoding="utf-8")
+    shutil.copystat(p, bak)
+    p.write_text(patched, encoding="utf-8")
+    return bak
+
 def ensure_dir(p: Path) -> None:
     p.mkdir(parents=True, exist_ok=True)
 
@@ -49,7 +70,7 @@ def patch_run_all(pyfile: Path) -> tuple[bool, str]:
     - fail-fast on non-zero
     - add -u to child python calls: run([py, "x.py"]) -> run([py, "-u", "x.py"])
     """
-    s = pyfile.read_text(encoding="utf-8")
+    original = s = pyfile.read_text(encoding="utf-8")
 
     changed = False
     out = []
@@ -57,7 +78,7 @@ def patch_run_all(pyfile: Path) -> tuple[bool, str]:
     # 1) run() body patch
     if "flush=True" not in s or "raise SystemExit" not in s:
         # patch only the run() function block (best-effort)
-        m = re.search(r"def run\(cmd\):\n(?:(?:    .*\n)|\n)+", s)
+        m = _RUN_BLOCK_RE.search(s)
         if m:
             old = m.group(0)
             new = (
@@ -75,14 +96,17 @@ def patch_run_all(pyfile: Path) -> tuple[bool, str]:
             out.append("WARN: could not locate def run(cmd) block reliably")
 
     # 2) add -u to run([py, "file.py"])
-    s2, n = re.subn(r"run\(\[py,\s*\"([^\"]+\.py)\"\]\)", r"run([py, \"-u\", \"\1\"])", s)
+    s2, n = _RUN_PY_CALL_RE.subn(r"run([py, \"-u\", \"\1\"])", s)
     if n:
         s = s2
         changed = True
         out.append(f"patched {n} run([py, ...]) calls to add -u")
 
+    # backup + write only when the text really differs
+    changed = changed and s != original
     if changed:
-        pyfile.write_text(s, encoding="utf-8")
+        bak = write_patched(pyfile, original, s)
+        out.append(f"backup: {bak.name}")
     return changed, "; ".join(out) if out else "no changes"
 
 def patch_dashboard(dash: Path) -> tuple[bool, str]:
@@ -92,16 +116,33 @@ def patch_dashboard(dash: Path) -> tuple[bool, str]:
     - inject safe_df_for_display (dedupe columns + stringify objects) if missing
     - wrap st.dataframe(df, ...) -> st.dataframe(safe_df_for_display(df), ...) for simple cases
     """
-    s = dash.read_text(encoding="utf-8")
+    original = s = dash.read_text(encoding="utf-8")
     changed = False
     out = []
 
-    # 1) Streamlit API: use_container_width -> width
-    if "use_container_width" in s:
-        s = s.replace("use_container_width=True", 'width="stretch"')
-        s = s.replace("use_container_width=False", 'width="content"')
+    # 1) single pass:
+    #    Streamlit API: use_container_width -> width
+    #    wrap st.dataframe(<name>, ...) -> safe_df_for_display(<name>)
+    hits = {"width": 0, "dataframe": 0}
+
+    def repl(m):
+        if m.group(1):
+            hits["width"] += 1
+            return 'width="stretch"'
+        if m.group(2):
+            hits["width"] += 1
+            return 'width="content"'
+        hits["dataframe"] += 1
+        return f"st.dataframe(safe_df_for_display({m.group(3)}),"
+
+    s2, n = _DASHBOARD_PATCH_RE.subn(repl, s)
+    if n:
+        s = s2
         changed = True
+    if hits["width"]:
         out.append("replaced use_container_width -> width")
+    if hits["dataframe"]:
+        out.append(f"wrapped {hits['dataframe']} st.dataframe(...) call(s)")
 
     # 2) Insert helpers if missing
     if "def safe_df_for_display" not in s:
@@ -124,16 +165,13 @@ def safe_df_for_display(df: pd.DataFrame) -> pd.DataFrame:
     \"\"\"PyArrow/Streamlit safe: unique cols + stringified object columns.\"\"\"
     df = dedupe_columns(df)
     df = df.copy()
-    for c in df.columns:
-        try:
-            if df[c].dtype == "object":
-                df[c] = df[c].map(lambda v: "" if v is None else str(v))
-        except Exception:
-            pass
+    obj_cols = df.select_dtypes(include="object").columns
+    if len(obj_cols):
+        df[obj_cols] = df[obj_cols].fillna("").astype(str)
     return df
 """.strip() + "\n\n"
         # put after imports block if possible
-        m = re.search(r'^(?:import .+\n|from .+ import .+\n)+\n', s, flags=re.M)
+        m = _IMPORTS_BLOCK_RE.search(s)
         if m:
             s = s[:m.end()] + helper + s[m.end():]
         else:
@@ -141,19 +179,10 @@ def safe_df_for_display(df: pd.DataFrame) -> pd.DataFrame:
         changed = True
         out.append("inserted safe_df_for_display() helpers")
 
-    # 3) Wrap st.dataframe(<name>, ...) -> safe_df_for_display(<name>)
-    def repl(m):
-        var = m.group(1)
-        return f"st.dataframe(safe_df_for_display({var}),"
-
-    s2, n = re.subn(r"st\.dataframe\(\s*([A-Za-z_]\w*)\s*,", repl, s)
-    if n:
-        s = s2
-        changed = True
-        out.append(f"wrapped {n} st.dataframe(...) call(s)")
-
+    changed = changed and s != original
     if changed:
-        dash.write_text(s, encoding="utf-8")
+        bak = write_patched(dash, original, s)
+        out.append(f"backup: {bak.name}")
     return changed, "; ".join(out) if out else "no changes"
 
 def write_bash_scripts(root: Path, port: int) -> tuple[bool, str]:
@@ -277,28 +306,68 @@ def check_streamlit_proc() -> CheckResult:
     ok = (out.strip() == "")
     return CheckResult(ok=ok, title="No streamlit processes", details=out.strip() or "NO streamlit processes")
 
+# dirs compileall must not descend into
+_COMPILE_SKIP_RE = re.compile(r"[\\/](\.git|__pycache__|\.venv|venv|node_modules)([\\/]|$)")
+
 def check_py_compile_all(root: Path) -> CheckResult:
-    bad = []
-    for p in root.rglob("*.py"):
-        try:
-            subprocess.run([sys.executable, "-m", "py_compile", str(p)], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        except subprocess.CalledProcessError as e:
-            bad.append((str(p), (e.stderr or e.stdout or "").strip()))
-    if bad:
-        details = "\n".join([f"- {f}: {err}" for f, err in bad[:50]])
-        return CheckResult(ok=False, title="py_compile all .py", details=f"FAIL ({len(bad)})\n{details}")
-    return CheckResult(ok=True, title="py_compile all .py", details="OK")
+    import compileall
+    import contextlib
+    import io
+
+    # force=False: files with an up-to-date .pyc are only stat()ed;
+    # workers=0 fans the rest out over all cores
+    ok = compileall.compile_dir(str(root), rx=_COMPILE_SKIP_RE, quiet=2, force=False, workers=0)
+    if ok:
+        return CheckResult(ok=True, title="py_compile all .py", details="OK")
+
+    # failure path only: re-run in-process to capture messages; files that
+    # compiled fine above are already up to date and get skipped
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        compileall.compile_dir(str(root), rx=_COMPILE_SKIP_RE, quiet=1, force=False, workers=1)
+    errors = [blk.strip() for blk in buf.getvalue().split("*** ") if blk.strip()]
+    details = "\n".join([f"- {err}" for err in errors[:50]])
+    return CheckResult(ok=False, title="py_compile all .py", details=f"FAIL ({len(errors)})\n{details}")
+
+def _table_row_estimates(cur: sqlite3.Cursor) -> dict[str, int]:
+    """
+    Row estimates from an existing sqlite_stat1 (written by PRAGMA optimize /
+    ANALYZE elsewhere) instead of a full count(*) B-tree scan per table. Never
+    runs ANALYZE itself: the doctor only reads. Tables missing from stat1 (or no
+    stat1 at all) are left to the caller's exact count(*) fallback.
+    """
+    import sqlite3
+
+    est: dict[str, int] = {}
+    try:
+        if cur.execute("SELECT 1 FROM sqlite_master WHERE name='sqlite_stat1';").fetchone() is None:
+            return {}
+        for tbl, stat in cur.execute("SELECT tbl, stat FROM sqlite_stat1;"):
+            try:
+                n = int(str(stat).split()[0])
+            except (ValueError, IndexError):
+                continue
+            est[tbl] = max(est.get(tbl, 0), n)
+    except sqlite3.Error:
+        return {}
+    return est
 
 def check_db(root: Path) -> CheckResult:
+    import sqlite3
+
     db = root / "data" / "atlas.db"
     if not db.exists():
         return CheckResult(ok=False, title="SQLite DB exists", details=str(db))
-    con = sqlite3.connect(str(db))
+    # read-only: the diagnostic takes no write lock and leaves the file untouched
+    con = sqlite3.connect(db.resolve().as_uri() + "?mode=ro", uri=True)
     cur = con.cursor()
     integrity = cur.execute("PRAGMA integrity_check;").fetchone()[0]
     tables = [r[0] for r in cur.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name;").fetchall()]
+    estimates = {t: n for t, n in _table_row_estimates(cur).items() if t in tables}
     counts = {}
     for t in tables:
+        if t in estimates:
+            continue
         try:
             counts[t] = cur.execute(f"SELECT count(*) FROM {t};").fetchone()[0]
         except Exception:
@@ -308,21 +377,51 @@ def check_db(root: Path) -> CheckResult:
     details = f"integrity_check: {integrity}\n" \
               f"tables: {tables}\n" \
               f"counts: {counts}"
+    if estimates:
+        details += f"\nestimated counts (sqlite_stat1, may be stale): {estimates}"
     return CheckResult(ok=ok, title="SQLite DB integrity", details=details)
 
-def env_info() -> str:
+def _env_info_cache_key() -> str:
+    # interpreter + site-packages mtimes: a pip install/uninstall touches the dir
+    import hashlib
+    import sysconfig
+
+    parts = [sys.executable]
+    for p in [sys.executable, *sorted({sysconfig.get_paths()["purelib"], sysconfig.get_paths()["platlib"]})]:
+        try:
+            parts.append(f"{p}:{os.path.getmtime(p)}")
+        except OSError:
+            parts.append(f"{p}:-")
+    return hashlib.blake2b("|".join(parts).encode("utf-8"), digest_size=8).hexdigest()
+
+def env_info(root: Path | None = None) -> str:
+    cache = None
+    if root is not None:
+        cache = root / "logs" / f".envinfo_{_env_info_cache_key()}.txt"
+        try:
+            return cache.read_text(encoding="utf-8")
+        except OSError:
+            pass
+
     parts = []
     parts.append(f"python: {sys.executable}")
     parts.append(f"python -V: {sys.version.replace(os.linesep,' ')}")
-    # key packages
+    # key packages: versions from dist-info metadata, without importing them
     pkgs = ["streamlit","pandas","pyarrow","numpy"]
     for m in pkgs:
         try:
-            mod = __import__(m)
-            parts.append(f"{m}: {getattr(mod,'__version__','?')}")
-        except Exception as e:
+            parts.append(f"{m}: {version(m)}")
+        except PackageNotFoundError as e:
             parts.append(f"{m}: MISSING ({e})")
-    return "\n".join(parts)
+    info = "\n".join(parts)
+
+    if cache is not None:
+        try:
+            ensure_dir(cache.parent)
+            cache.write_text(info, encoding="utf-8")
+        except OSError:
+            pass
+    return info
 
 def main() -> int:
     ap = argparse.ArgumentParser(description="Atlas doctor: diagnose + safe auto-fix (no deletions).")
@@ -338,7 +437,7 @@ def main() -> int:
     lines = []
     lines.append(f"# Atlas doctor report {TS}\n\n")
     lines.append("## Environment\n\n")
-    lines.append("```\n" + env_info() + "\n```\n\n")
+    lines.append("```\n" + env_info(root) + "\n```\n\n")
 
     results: list[CheckResult] = []
 
@@ -354,29 +453,16 @@ def main() -> int:
         # run_all.py
         ra = root / "run_all.py"
         if ra.exists():
-            bak = backup_file(ra)
             changed, msg = patch_run_all(ra)
-            if not changed:
-                # if no change, restore original backup to avoid noise
-                ra.write_text(bak.read_text(encoding="utf-8"), encoding="utf-8")
-                bak.unlink(missing_ok=True)
-                lines.append(f"- run_all.py: no changes\n")
-            else:
-                lines.append(f"- run_all.py: {msg} (backup: {bak.name})\n")
+            lines.append(f"- run_all.py: {msg if changed else 'no changes'}\n")
         else:
             lines.append("- run_all.py: not found\n")
 
         # dashboard.py
         dash = root / "dashboard.py"
         if dash.exists():
-            bak = backup_file(dash)
             changed, msg = patch_dashboard(dash)
-            if not changed:
-                dash.write_text(bak.read_text(encoding="utf-8"), encoding="utf-8")
-                bak.unlink(missing_ok=True)
-                lines.append("- dashboard.py: no changes\n")
-            else:
-                lines.append(f"- dashboard.py: {msg} (backup: {bak.name})\n")
+            lines.append(f"- dashboard.py: {msg if changed else 'no changes'}\n")
         else:
             lines.append("- dashboard.py: not found\n")
 
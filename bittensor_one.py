@@ -1,14 +1,20 @@
 #!/usr/bin/env python3
 import argparse
+import contextlib
+import functools
 import hashlib
+import io
 import json
 import os
+import re
 import sqlite3
 import subprocess
 import sys
-import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+from storage import tune_sqlite  # общий профиль WAL/NORMAL/cache/mmap для всех писателей atlas.db
 
 ATOM_FEEDS = {
     "Bittensor Releases": "https://github.com/opentensor/bittensor/releases.atom",
@@ -25,40 +31,102 @@ def utc_iso() -> str:
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
 
 def sha(s: str) -> str:
+    # SHA-256 остаётся: hash-колонка хранится в БД, смена алгоритма сломала бы
+    # дедуп со старыми строками. hashlib/OpenSSL и так использует SHA-NI.
     return hashlib.sha256(s.encode("utf-8")).hexdigest()
 
 def short(s: str, n: int = 1200) -> str:
     s = (s or "").strip()
     return s if len(s) <= n else s[: n - 1].rstrip() + "…"
 
-def parse_atom_feed(url: str) -> List[Dict[str, Any]]:
-    # без зависимостей
+USER_AGENT = "atlas-bittensor-one"
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:  # requests опционален: без него — urllib, как раньше
+    requests = None
+
+_SESSION = None
+
+def http_session():
+    """Shared keep-alive session: TCP+TLS to github.com negotiated once, not per feed."""
+    global _SESSION
+    if _SESSION is None and requests is not None:
+        s = requests.Session()
+        s.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        s.mount("https://", adapter)
+        s.mount("http://", adapter)
+        _SESSION = s
+    return _SESSION
+
+@contextlib.contextmanager
+def http_open(url: str, timeout: int = 25) -> Iterator[BinaryIO]:
+    """Open the response as a raw byte stream: the parser reads it directly,
+    without materializing (or decoding) the whole document first."""
+    session = http_session()
+    if session is not None:
+        with session.get(url, timeout=timeout, stream=True) as resp:
+            resp.raise_for_status()
+            resp.raw.decode_content = True  # gzip/deflate снимает urllib3
+            yield resp.raw
+        return
+
     import urllib.request
-    import xml.etree.ElementTree as ET
+    req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        yield resp
+
+try:
+    from lxml import etree as _lxml_etree  # C-парсер libxml2, опционален
+except ImportError:
+    _lxml_etree = None
+
+ATOM_NS = "http://www.w3.org/2005/Atom"
+ATOM_ENTRY = "{%s}entry" % ATOM_NS
+
+def iter_atom_entries(xml: Union[bytes, BinaryIO]):
+    """Stream <entry> elements; each one is cleared after use so memory stays ~one entry.
+    xml — bytes or a binary file-like object; encoding is detected by the parser."""
+    src = io.BytesIO(xml) if isinstance(xml, (bytes, bytearray)) else xml
+    if _lxml_etree is not None:
+        for _, entry in _lxml_etree.iterparse(
+            src, events=("end",), tag=ATOM_ENTRY,
+            resolve_entities=False, no_network=True,
+        ):
+            yield entry
+            entry.clear()
+            while entry.getprevious() is not None:
+                del entry.getparent()[0]
+        return
 
-    req = urllib.request.Request(url, headers={"User-Agent": "atlas-bittensor-one"})
-    with urllib.request.urlopen(req, timeout=25) as resp:
-        xml = resp.read()
+    import xml.etree.ElementTree as ET
+    for _, elem in ET.iterparse(src, events=("end",)):
+        if elem.tag == ATOM_ENTRY:
+            yield elem
+            elem.clear()
 
-    root = ET.fromstring(xml)
-    ns = {"a": "http://www.w3.org/2005/Atom"}
+def parse_atom_feed(url: str) -> List[Dict[str, Any]]:
+    ns = {"a": ATOM_NS}
 
     out = []
-    for entry in root.findall("a:entry", ns):
-        title = (entry.findtext("a:title", default="", namespaces=ns) or "").strip()
-        published = (entry.findtext("a:published", default="", namespaces=ns) or "").strip()
-        updated = (entry.findtext("a:updated", default="", namespaces=ns) or "").strip()
-        summary = (entry.findtext("a:content", default="", namespaces=ns) or
-                   entry.findtext("a:summary", default="", namespaces=ns) or "").strip()
-
-        link = ""
-        for l in entry.findall("a:link", ns):
-            if l.get("rel") in (None, "", "alternate"):
-                link = l.get("href") or ""
-                break
-
-        ts = published or updated or utc_iso()
-        out.append({"title": title, "link": link, "published": ts, "summary": summary})
+    with http_open(url) as resp:
+        for entry in iter_atom_entries(resp):
+            title = (entry.findtext("a:title", default="", namespaces=ns) or "").strip()
+            published = (entry.findtext("a:published", default="", namespaces=ns) or "").strip()
+            updated = (entry.findtext("a:updated", default="", namespaces=ns) or "").strip()
+            summary = (entry.findtext("a:content", default="", namespaces=ns) or
+                       entry.findtext("a:summary", default="", namespaces=ns) or "").strip()
+
+            link = ""
+            for l in entry.findall("a:link", ns):
+                if l.get("rel") in (None, "", "alternate"):
+                    link = l.get("href") or ""
+                    break
+
+            ts = published or updated or utc_iso()
+            out.append({"title": title, "link": link, "published": ts, "summary": summary})
     return out
 
 def table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
@@ -74,7 +142,11 @@ def pick_col(cols: List[str], candidates: List[str]) -> Optional[str]:
     return None
 
 def resolve_cols(cols: List[str]) -> Dict[str, Optional[str]]:
-    return {
+    return dict(_resolve_cols_cached(tuple(cols)))
+
+@functools.lru_cache(maxsize=8)
+def _resolve_cols_cached(cols: Tuple[str, ...]) -> Tuple[Tuple[str, Optional[str]], ...]:
+    return tuple({
         "ts": pick_col(cols, ["ts", "timestamp", "created_at", "created", "time", "dt"]),
         "origin": pick_col(cols, ["origin", "source_name", "provider", "feed", "channel"]),
         "kind": pick_col(cols, ["kind", "type", "category"]),
@@ -90,23 +162,24 @@ def resolve_cols(cols: List[str]) -> Dict[str, Optional[str]]:
         # ВАЖНО: у тебя score NOT NULL
         "sentiment": pick_col(cols, ["sentiment", "label", "tone"]),
         "score": pick_col(cols, ["score"]),
-    }
-
-def already_in_db(conn: sqlite3.Connection, mapping: Dict[str, Optional[str]], url: str, hv: str) -> bool:
-    if mapping.get("url"):
-        col = mapping["url"]
-        cur = conn.execute(f"SELECT 1 FROM signals WHERE {col} = ? LIMIT 1;", (url,))
-        if cur.fetchone():
-            return True
-    if mapping.get("hash"):
-        col = mapping["hash"]
-        cur = conn.execute(f"SELECT 1 FROM signals WHERE {col} = ? LIMIT 1;", (hv,))
-        if cur.fetchone():
-            return True
-    return False
-
-def insert_signal(
-    conn: sqlite3.Connection,
+    }.items())
+
+def ensure_dedup_index(conn: sqlite3.Connection, mapping: Dict[str, Optional[str]]) -> None:
+    # дедуп делает сама БД: UNIQUE по hash + INSERT OR IGNORE,
+    # url проверяется по всем источникам через NOT EXISTS в INSERT (см. build_insert_sql),
+    # ему нужен обычный индекс по url
+    url_col = mapping.get("url")
+    if url_col:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_signals_{url_col} ON signals({url_col});")
+    col = mapping.get("hash")
+    if not col:
+        return
+    try:
+        conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_signals_hash ON signals({col});")
+    except sqlite3.IntegrityError as e:
+        print(f"WARN: idx_signals_hash not created (duplicates in {col}): {e}")
+
+def signal_values(
     mapping: Dict[str, Optional[str]],
     *,
     ts: str,
@@ -119,10 +192,11 @@ def insert_signal(
     level: str = "🟡",
     horizon: str = "T1",
     meta: Optional[Dict[str, Any]] = None,
+    meta_json: Optional[str] = None,
     sentiment: str = "neutral",
     score: float = 0.35,
-) -> int:
-    meta = meta or {}
+) -> Dict[str, Any]:
+    """meta_json — уже сериализованный meta (инвариант фида), иначе json.dumps(meta)."""
     values: Dict[str, Any] = {}
 
     if mapping.get("ts"): values[mapping["ts"]] = ts
@@ -136,8 +210,11 @@ def insert_signal(
     if mapping.get("level"): values[mapping["level"]] = level
     if mapping.get("horizon"): values[mapping["horizon"]] = horizon
     if mapping.get("hash"): values[mapping["hash"]] = sha(url + "||" + title)
-    if mapping.get("meta") and meta:
-        values[mapping["meta"]] = json.dumps(meta, ensure_ascii=False)
+    if mapping.get("meta"):
+        if meta_json is None and meta:
+            meta_json = json.dumps(meta, ensure_ascii=False)
+        if meta_json:
+            values[mapping["meta"]] = meta_json
 
     # КРИТИЧЕСКОЕ: обеспечить NOT NULL поля
     if mapping.get("sentiment"):
@@ -145,23 +222,64 @@ def insert_signal(
     if mapping.get("score"):
         values[mapping["score"]] = float(score)
 
-    cols_sql = ", ".join(values.keys())
-    ph = ", ".join(["?"] * len(values))
-    sql = f"INSERT INTO signals ({cols_sql}) VALUES ({ph});"
-    cur = conn.execute(sql, list(values.values()))
-    conn.commit()
-    return int(cur.lastrowid)
+    return values
+
+# порядок полей, которые пишет signal_values()
+INSERT_FIELDS = (
+    "ts", "origin", "title", "text", "url", "project", "kind", "source",
+    "level", "horizon", "hash", "meta", "sentiment", "score",
+)
+
+def build_insert_sql(mapping: Dict[str, Optional[str]]) -> Tuple[str, List[str]]:
+    """INSERT строится один раз на прогон: набор колонок от строки к строке не меняется.
+
+    UNIQUE(source, url) ловит повтор только внутри source = "rss"; url, уже лежащий
+    в БД под любым источником, отсекается NOT EXISTS (как раньше already_in_db)."""
+    col_order = list(dict.fromkeys(mapping[f] for f in INSERT_FIELDS if mapping.get(f)))
+    cols_sql = ", ".join(col_order)
+    ph = ", ".join(f"?{i}" for i in range(1, len(col_order) + 1))
+    url_col = mapping.get("url")
+    if not url_col:
+        return f"INSERT OR IGNORE INTO signals ({cols_sql}) VALUES ({ph});", col_order
+    url_ph = f"?{col_order.index(url_col) + 1}"
+    return (
+        f"INSERT OR IGNORE INTO signals ({cols_sql}) SELECT {ph} "
+        f"WHERE NOT EXISTS (SELECT 1 FROM signals WHERE {url_col} = {url_ph});"
+    ), col_order
+
+def insert_signals(
+    cur: sqlite3.Cursor,
+    sql: str,
+    col_order: List[str],
+    rows: List[Dict[str, Any]],
+) -> int:
+    """Batch insert через один подготовленный INSERT OR IGNORE (executemany).
+    Не коммитит: транзакцией управляет вызывающий (with conn:).
+    Returns the number of rows actually inserted (duplicates are skipped by unique indexes)."""
+    # rowcount, не total_changes: тот считает и строки, изменённые триггерами stats_counters
+    cur.executemany(sql, ([values.get(c) for c in col_order] for values in rows))
+    return max(cur.rowcount, 0)
+
+TEXT_PAD = "\n\nСобытие: релиз/изменение. Сигнал оценивается по структуре и последствиям во времени."
+TEXT_MAX = 3000
 
 def build_text(origin: str, title: str, summary: str, url: str, published: str) -> str:
     base = f"{origin}\n{title}\n{published}\n{url}\n\n{summary}".strip()
-    if len(base) < 140:
-        base += "\n\nСобытие: релиз/изменение. Сигнал оценивается по структуре и последствиям во времени."
-    return short(base, 3000)
+    n = len(base)  # длина считается один раз
+    if n < 140:
+        # короткий текст: с добавкой всё равно < TEXT_MAX, short() не нужен
+        # (lstrip — только для пустого base)
+        return (base + TEXT_PAD).lstrip()
+    if n <= TEXT_MAX:
+        return base  # уже stripped, short() вернул бы то же самое
+    return short(base, TEXT_MAX)
+
+RED_KEYS = ["security", "vulnerability", "cve", "critical", "fork", "consensus", "breaking", "exploit"]
+# один проход regex-движка вместо len(RED_KEYS) подстрочных поисков
+_RED_RE = re.compile("|".join(map(re.escape, RED_KEYS)))
 
 def level_horizon_from_text(text: str) -> Tuple[str, str]:
-    t = text.lower()
-    red_keys = ["security", "vulnerability", "cve", "critical", "fork", "consensus", "breaking", "exploit"]
-    if any(k in t for k in red_keys):
+    if _RED_RE.search(text.lower()):
         return ("🔴", "T0")
     return ("🟡", "T1")
 
@@ -183,9 +301,10 @@ def show_tail(conn: sqlite3.Connection, mapping: Dict[str, Optional[str]], limit
     params.append(limit)
     cur = conn.execute(sql, params)
     rows = cur.fetchall()
+    names = [c[0] for c in cur.description]
     print("\nХвост сигналов (Bittensor/Subtensor):")
     for r in rows:
-        rd = dict(zip([c[0] for c in cur.description], r))
+        rd = dict(zip(names, r))
         ts = rd.get(ts_col, "")
         origin = rd.get(origin_col, "") if origin_col else ""
         title = rd.get(title_col, "") if title_col else ""
@@ -211,16 +330,25 @@ def main() -> None:
         sys.exit(1)
 
     conn = sqlite3.connect(path)
+    tune_sqlite(conn)
     try:
         cols = table_columns(conn, "signals")
         if not cols:
             print("ОШИБКА: таблица signals не найдена. Запусти init_db().")
             sys.exit(1)
         mapping = resolve_cols(cols)
-
-        inserted = 0
-        for origin, feed_url in ATOM_FEEDS.items():
-            entries = parse_atom_feed(feed_url)
+        ensure_dedup_index(conn, mapping)
+        insert_sql, col_order = build_insert_sql(mapping)
+
+        pending: List[Dict[str, Any]] = []
+        seen: set = set()  # дедуп внутри прогона; против БД — NOT EXISTS по url + INSERT OR IGNORE
+        # фиды качаем параллельно (время ~ max RTT, а не сумма);
+        # запись в SQLite остаётся в главном потоке
+        with ThreadPoolExecutor(max_workers=len(ATOM_FEEDS)) as ex:
+            fetched = list(ex.map(parse_atom_feed, ATOM_FEEDS.values()))
+
+        for (origin, feed_url), entries in zip(ATOM_FEEDS.items(), fetched):
+            meta_json = json.dumps({"feed": feed_url}, ensure_ascii=False)  # один раз на фид
             for e in entries:
                 title = (e.get("title") or "").strip()
                 url = (e.get("link") or "").strip()
@@ -228,13 +356,15 @@ def main() -> None:
                 summary = (e.get("summary") or "").strip()
                 if not title or not url:
                     continue
-                hv = sha(url + "||" + title)
-                if already_in_db(conn, mapping, url, hv):
+                # hv = sha(url||title) отличается только при другом url,
+                # так что для дедупа в прогоне достаточно самого url
+                if url in seen:
                     continue
+                seen.add(url)
                 text = build_text(origin, title, summary, url, published)
                 lvl, hz = level_horizon_from_text(text)
-                insert_signal(
-                    conn, mapping,
+                pending.append(signal_values(
+                    mapping,
                     ts=published,
                     origin=origin,
                     title=title,
@@ -244,12 +374,13 @@ def main() -> None:
                     kind="rss",
                     level=lvl,
                     horizon=hz,
-                    meta={"feed": feed_url},
+                    meta_json=meta_json,
                     sentiment="neutral",
                     score=0.35,
-                )
-                inserted += 1
-            time.sleep(0.2)
+                ))
+
+        with conn:  # одна транзакция на прогон: commit на выходе, rollback при ошибке
+            inserted = insert_signals(conn.cursor(), insert_sql, col_order, pending)
 
         print(f"OK: вставлено новых сигналов: {inserted}")
 
@@ -1,12 +1,21 @@
+import functools
 import sqlite3
-from pathlib import Path
 from urllib.parse import quote_plus
+import numpy as np
 import pandas as pd
 import streamlit as st
 
+# Copy-on-Write: copy()/rename/set_axis become lazy, real copies happen only on write.
+# pandas >= 3 always runs CoW (the option is deprecated there).
+if int(pd.__version__.split(".")[0]) < 3:
+    try:
+        pd.options.mode.copy_on_write = True
+    except (KeyError, AttributeError):  # pandas < 1.5: no CoW mode
+        pass
+
 # Ensure DB schema exists
+import storage
 try:
-    import storage
     storage.init_db()
 except Exception as e:
     print(f"[warn] init_db failed: {e}")
@@ -21,44 +30,39 @@ def dedupe_columns(df: pd.DataFrame) -> pd.DataFrame:
         n = seen.get(c0, 0) + 1
         seen[c0] = n
         new_cols.append(c0 if n == 1 else f"{c0}__{n}")
-    df = df.copy()
-    df.columns = new_cols
-    return df
+    if new_cols == cols:
+        return df  # уже уникальные строковые имена — без копии
+    return df.set_axis(new_cols, axis=1)
 
 def safe_df_for_display(df: pd.DataFrame) -> pd.DataFrame:
     """PyArrow/Streamlit safe: unique cols + stringified object columns."""
     df = dedupe_columns(df)
-    df = df.copy()
-    # make object columns safer for arrow
-    for c in df.columns:
-        try:
-            if df[c].dtype == "object":
-                df[c] = df[c].map(lambda v: "" if v is None else str(v))
-        except Exception:
-            pass
+    # make object columns safer for arrow: one vectorized pass, no per-cell lambda
+    obj_cols = df.select_dtypes(include="object").columns
+    if len(obj_cols):
+        df = df.copy(deep=False)  # не трогаем кэшированный фрейм вызывающего
+        df[obj_cols] = df[obj_cols].fillna("").astype(str)
     return df
 
-def dedupe_columns(df: pd.DataFrame) -> pd.DataFrame:
-    """Make df.columns unique: a, a -> a, a__2 (stable)."""
-    cols = list(df.columns)
-    seen = {}
-    new_cols = []
-    for c in cols:
-        c0 = str(c)
-        n = seen.get(c0, 0) + 1
-        seen[c0] = n
-        new_cols.append(c0 if n == 1 else f"{c0}__{n}")
-    df = df.copy()
-    df.columns = new_cols
-    return df
-
-DB_PATH = Path("data/atlas.db")
+DB_PATH = storage.DB_PATH  # anchored next to the code, same file every writer uses
 
 # --------------------------
 # DB
 # --------------------------
 def _connect():
-    return sqlite3.connect(str(DB_PATH), check_same_thread=False)
+    conn = sqlite3.connect(str(DB_PATH), check_same_thread=False)
+    # WAL: чтение дашборда не блокирует сборщики; большой cache + mmap
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+    except sqlite3.DatabaseError:
+        pass  # read-only mount
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.execute("PRAGMA mmap_size=268435456")
+    # дашборд только читает: query_only страхует от случайной записи
+    conn.execute("PRAGMA query_only=1")
+    return conn
 
 def _table_exists(conn, name: str) -> bool:
     cur = conn.execute(
@@ -67,8 +71,47 @@ def _table_exists(conn, name: str) -> bool:
     )
     return cur.fetchone() is not None
 
-def load_signals(limit: int = 5000) -> pd.DataFrame:
-    """Best-effort loader: tries common tables, returns DataFrame (possibly empty)."""
+_TS_ALIASES = ("ts", "timestamp", "created_at", "time", "datetime")
+_UI_COLS = frozenset((
+    "id", "sid", "uuid",
+    *_TS_ALIASES,
+    "kind", "type", "signal_type", "category",
+    "text", "content", "body", "message", "title", "summary",
+    "source", "src",
+    "origin", "url", "tags", "score", "color", "label", "rationale",
+    "object", "project", "note", "signal",
+))
+# низкая кардинальность: храним как category (int-коды вместо строк)
+_CATEGORY_COLS = frozenset((
+    "kind", "type", "signal_type", "category",
+    "source", "src", "origin", "color", "label", "project",
+))
+
+def _as_categories(df: pd.DataFrame) -> pd.DataFrame:
+    for c in df.columns:
+        col = df[c]
+        if (
+            c.lower() in _CATEGORY_COLS
+            and pd.api.types.is_string_dtype(col.dtype)
+            and col.nunique() * 2 <= len(col)
+        ):
+            df[c] = col.astype("category")
+    return df
+
+def _db_mtime() -> float:
+    """Cache key for load_signals: changes whenever atlas.db (or its WAL) is written."""
+    mt = 0.0
+    for p in (DB_PATH, DB_PATH.with_name(DB_PATH.name + "-wal")):
+        try:
+            mt = max(mt, p.stat().st_mtime)
+        except OSError:
+            pass
+    return mt
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_signals(limit: int = 5000, db_mtime: float = 0.0) -> pd.DataFrame:
+    """Best-effort loader: tries common tables, returns DataFrame (possibly empty).
+    db_mtime is only a cache key: reruns reuse the frame until the DB changes."""
     if not DB_PATH.exists():
         return pd.DataFrame()
 
@@ -84,98 +127,142 @@ def load_signals(limit: int = 5000) -> pd.DataFrame:
         if table is None:
             return pd.DataFrame()
 
-        df = pd.read_sql_query(f"SELECT * FROM {table} ORDER BY rowid DESC LIMIT ?", conn, params=(limit,))
-        return df
+        # только колонки, которые использует UI (без raw/meta-блобов)
+        cols = [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+        sel = [c for c in cols if c.lower() in _UI_COLS] or ["*"]
+        lc = {c.lower(): c for c in cols}
+        order = next((lc[k] for k in _TS_ALIASES if k in lc), "rowid")
+
+        df = pd.read_sql_query(
+            f"SELECT {', '.join(sel)} FROM {table} ORDER BY {order} DESC LIMIT ?",
+            conn,
+            params=(limit,),
+        )
+        return _as_categories(df)
     finally:
         conn.close()
 
 # --------------------------
 # UI helpers
 # --------------------------
+@functools.lru_cache(maxsize=2048)
 def g_url(query: str) -> str:
+    # на каждом rerun карточки запрашивают одни и те же ссылки — quote_plus один раз
     q = quote_plus((query or "").strip())
     return f"https://www.google.com/search?q={q}"
 
+# возможные имена: канон -> алиасы (в нижнем регистре)
+_CANONICAL = {
+    "ts": _TS_ALIASES,
+    "type": ("kind", "type", "signal_type", "category"),
+    "text": ("text", "content", "body", "message", "title"),
+    "source": ("source", "src"),
+    "id": ("id", "sid", "uuid"),
+}
+_ALIAS_TO_CANON = {a: c for c, aliases in _CANONICAL.items() for a in aliases}
+
 def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     """Try to standardize common column names for display."""
     if df.empty:
         return df
 
-    # возможные имена
-    ren = {}
-    for c in df.columns:
-        lc = c.lower()
-        if lc in ("ts", "timestamp", "created_at", "time", "datetime"):
-            ren[c] = "ts"
-        elif lc in ("kind", "type", "signal_type", "category"):
-            ren[c] = "type"
-        elif lc in ("text", "content", "body", "message", "title"):
-            ren[c] = "text"
-        elif lc in ("source", "src"):
-            ren[c] = "source"
-        elif lc in ("id", "sid", "uuid"):
-            ren[c] = "id"
-    df = df.rename(columns=ren)
-    return df
-
-def _as_text(v) -> str:
-    try:
-        if v is None:
-            return ""
-        # pandas NA/NaT or numpy nan
-        try:
-            import pandas as _pd
-            # _pd.isna on non-scalar returns array/Series -> avoid boolean context
-            r = _pd.isna(v)
-            if isinstance(r, (bool,)):
-                if r:
-                    return ""
-        except Exception:
-            pass
-        t = str(v).strip()
-        return "" if t in ("", "nan", "NaT", "None") else t
-    except Exception:
-        return ""
+    ren = {c: _ALIAS_TO_CANON[c.lower()] for c in df.columns if c.lower() in _ALIAS_TO_CANON}
+    return df.rename(columns=ren)
 
 def _as_text(v) -> str:
     """Safe stringify for scalars / lists / dicts / pandas objects."""
-    try:
-        if v is None:
+    if v is None:
+        return ""
+    if isinstance(v, str):
+        t = v.strip()
+    else:
+        # явные проверки вместо try/except: NaN/NaT/NA — только у скаляров
+        if pd.api.types.is_scalar(v) and pd.isna(v):
             return ""
-        try:
-            import pandas as _pd
-            r = _pd.isna(v)
-            if isinstance(r, bool) and r:
-                return ""
-        except Exception:
-            pass
         t = str(v).strip()
-        return "" if t in ("", "nan", "NaT", "None") else t
-    except Exception:
-        return ""
+    return "" if t in ("", "nan", "NaT", "None") else t
 
-def pick_text(row: pd.Series) -> str:
+def pick_text(row) -> str:
+    """row — pd.Series или dict-запись (to_dict(orient="records"))."""
     for k in ("text", "content", "message", "title", "summary"):
-        if k in row.index:
+        if k in row:
             t = _as_text(row.get(k))
             if t:
                 return t
 
     # fallback: первые поля как строка
     parts = []
-    for k in list(row.index)[:6]:
+    for k in list(row.keys())[:6]:
         parts.append(f"{k}={_as_text(row.get(k))}")
     return " | ".join(parts)
 
-def safe_id(row: pd.Series, fallback: int) -> str:
+_TEXT_COLS = ("text", "content", "message", "title", "summary")
+
+def _as_text_series(col: pd.Series) -> pd.Series:
+    """Vectorized _as_text for a whole column."""
+    t = col.astype(str).str.strip()
+    t = t.mask(col.isna() | t.isin(("nan", "NaT", "None")), "")
+    return t
+
+def _columns_named(df: pd.DataFrame, k: str) -> list:
+    """All columns labelled k (normalize_columns may map several to one name)."""
+    sub = df[k]
+    if isinstance(sub, pd.DataFrame):
+        return [sub.iloc[:, j] for j in range(sub.shape[1])]
+    return [sub]
+
+def search_text(df: pd.DataFrame) -> pd.Series:
+    """pick_text() for every row at once: first non-empty text-like column."""
+    out = pd.Series("", index=df.index, dtype=object)
+    cols = frozenset(df.columns)
+    for k in _TEXT_COLS:
+        if k in cols:
+            for col in _columns_named(df, k):
+                out = out.mask(out == "", _as_text_series(col))
+    # редкий fallback (нет текстовых полей) — построчно, только для пустых;
+    # dict-записи вместо apply(axis=1), который строит Series на каждую строку
+    empty = out == ""
+    if empty.any():
+        out[empty] = [pick_text(r) for r in dedupe_columns(df[empty]).to_dict(orient="records")]
+    return out
+
+def safe_id(row, fallback: int) -> str:
     for k in ("id", "sid", "uuid"):
-        if k in row.index and str(row.get(k, "")).strip() not in ("", "nan", "NaT", "None"):
+        if k in row and str(row.get(k, "")).strip() not in ("", "nan", "NaT", "None"):
             return str(row[k])
     return str(fallback)
 
+def card_ids(df: pd.DataFrame) -> pd.Series:
+    """safe_id() for every row at once (fallback = 1-based position)."""
+    out = pd.Series([str(i) for i in range(1, len(df) + 1)], index=df.index, dtype=object)
+    taken = pd.Series(False, index=df.index)
+    cols = frozenset(df.columns)
+    for k in ("id", "sid", "uuid"):
+        if k in cols:
+            col = _columns_named(df, k)[0]  # duplicate labels (normalize_columns): the first one
+            v = col.astype(str)
+            ok = ~taken & col.notna() & ~v.str.strip().isin(("", "nan", "NaT", "None"))
+            out[ok] = v[ok]
+            taken |= ok
+    return out
+
 # --------------------------
 # Views
 # --------------------------
+def _options(col: pd.Series) -> list:
+    """Sorted distinct non-null values; for category columns — straight from the categories."""
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        return sorted({str(c) for c in col.cat.remove_unused_categories().cat.categories})
+    return sorted(col[col.notna()].astype(str).unique())
+
+def _isin_str(col: pd.Series, sel: list) -> pd.Series:
+    """col.astype(str).isin(sel) without stringifying every row for category columns:
+    the test runs once per category and is gathered back through the int codes."""
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        hit = np.append(col.cat.categories.astype(str).isin(sel), False)  # code -1 (NaN) -> False
+        return pd.Series(hit[col.cat.codes.to_numpy()], index=col.index)
+    return col.astype(str).isin(sel)
+
 def sidebar_filters(df: pd.DataFrame) -> pd.DataFrame:
     st.sidebar.header("Фильтры")
 
@@ -183,32 +270,47 @@ def sidebar_filters(df: pd.DataFrame) -> pd.DataFrame:
         st.sidebar.info("База пуста или таблица не найдена.")
         return df
 
+    # один общий булев mask вместо промежуточных фреймов
+    m = pd.Series(True, index=df.index)
+    cols = frozenset(df.columns)
+
     # тип
-    if "type" in df.columns:
-        types = sorted([t for t in df["type"].dropna().astype(str).unique()])
+    if "type" in cols:
+        types = _options(df["type"])
         sel = st.sidebar.multiselect("Type", types, default=types)
         if sel:
-            df = df[df["type"].astype(str).isin(sel)]
+            m &= _isin_str(df["type"], sel)
 
     # источник
-    if "source" in df.columns:
-        sources = sorted([s for s in df["source"].dropna().astype(str).unique()])
+    if "source" in cols:
+        sources = _options(df["source"])
         sel_s = st.sidebar.multiselect("Source", sources, default=sources)
         if sel_s:
-            df = df[df["source"].astype(str).isin(sel_s)]
+            m &= _isin_str(df["source"], sel_s)
 
     # поиск
     q = st.sidebar.text_input("Поиск по тексту", value="")
     if q.strip():
         qq = q.strip().lower()
-        df = df[df.apply(lambda r: qq in pick_text(r).lower(), axis=1)]
+        m &= search_text(df).str.lower().str.contains(qq, regex=False, na=False)
 
-    return df
+    return df if m.all() else df[m]
+
+TABLE_MAX_ROWS = 500  # таблица всё равно показывает виртуальное окно
 
 def table_view(df: pd.DataFrame):
     st.subheader("Сигналы")
-    df = dedupe_columns(df)
-    st.dataframe(safe_df_for_display(df), width="stretch", height=420)
+    if len(df) > TABLE_MAX_ROWS:
+        st.caption(f"Показаны первые {TABLE_MAX_ROWS} из {len(df)}.")
+    # safe_df_for_display сам делает dedupe_columns
+    d = safe_df_for_display(df.head(TABLE_MAX_ROWS))
+    cfg = {}
+    if "url" in d.columns:
+        cfg["url"] = st.column_config.LinkColumn("url")
+    if "score" in d.columns and pd.api.types.is_numeric_dtype(d["score"].dtype):
+        d = d.assign(score=pd.to_numeric(d["score"], downcast="float"))  # float32 в Arrow
+        cfg["score"] = st.column_config.NumberColumn("score", format="%.3f")
+    st.dataframe(d, width="stretch", height=420, column_config=cfg)
 
 def cards_view(df: pd.DataFrame):
     st.subheader("Карточки")
@@ -220,16 +322,17 @@ def cards_view(df: pd.DataFrame):
     # сколько карточек
     n = st.slider("Количество карточек", 5, 200, 25, step=5, key="n_cards")
     df2 = df.head(n)
+    # id/текст/ts считаются одним векторным проходом; в цикле — только виджеты
+    ids = card_ids(df2).to_numpy()
+    texts = search_text(df2).to_numpy()
+    tss = df2["ts"].to_numpy() if "ts" in df2.columns else [None] * len(df2)
 
-    for i, (_, row) in enumerate(df2.iterrows(), 1):
-        sid = safe_id(row, i)
-        text = pick_text(row)
-
+    for i, (sid, text, ts) in enumerate(zip(ids, texts, tss), 1):
         with st.container(border=True):
             cols = st.columns([6, 2, 2, 2])
             cols[0].markdown(f"**{text[:200]}**")
-            if "ts" in row.index and pd.notna(row["ts"]):
-                cols[0].caption(str(row["ts"]))
+            if pd.notna(ts):
+                cols[0].caption(str(ts))
 
             # 1) Импульс (локальная отметка, ничего в БД не пишет)
             if cols[1].button("Импульс", key=f"imp_{sid}_{i}"):
@@ -260,7 +363,7 @@ def main():
 
     st.title("Pulse Atlas · Dashboard (one-file)")
 
-    df = load_signals(limit=5000)
+    df = load_signals(limit=5000, db_mtime=_db_mtime())
     df = normalize_columns(df)
 
     df_f = sidebar_filters(df)
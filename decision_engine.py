@@ -13,6 +13,8 @@ import sqlite3
 from datetime import datetime, timezone
 from typing import Any, Optional
 
+from storage import tune_sqlite
+
 DB = os.path.expanduser("~/Projects/atlas/data/atlas.db")
 
 
@@ -20,6 +22,29 @@ def now_utc_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def connect(db: str = DB, **kwargs: Any) -> sqlite3.Connection:
+    con = sqlite3.connect(db, **kwargs)
+    # WAL + NORMAL: one fsync per checkpoint, readers (dashboard) don't block us
+    tune_sqlite(con)
+    return con
+
+
+# process-lifetime connection: opened and tuned once, reused by every main() call
+_CON: Optional[sqlite3.Connection] = None
+_CON_DB = ""
+
+
+def get_connection() -> sqlite3.Connection:
+    global _CON, _CON_DB
+    if _CON is None or _CON_DB != DB:
+        if _CON is not None:
+            _CON.close()
+        # autocommit mode: transactions are explicit BEGIN ... COMMIT in main()
+        _CON = connect(DB, check_same_thread=False, isolation_level=None)
+        _CON_DB = DB
+    return _CON
+
+
 def get_state(cur: sqlite3.Cursor, k: str, default: str = "") -> str:
     row = cur.execute("SELECT v FROM engine_state WHERE k=?", (k,)).fetchone()
     return (row[0] if row and row[0] is not None else default) or default
@@ -39,88 +64,89 @@ def dedup_key(action_type: str, signal_id: int, url: str) -> str:
     return action_type + ":" + str(signal_id) + ":" + u
 
 
-def action_for_signal(row: tuple[Any, ...]) -> Optional[dict[str, Any]]:
+# color -> (action_type, priority, fallback title); GREEN -> no action
+ACTION_RULES: dict[str, tuple[str, int, str]] = {
+    "🔴": ("investigate", 90, "red signal"),  # RED -> investigate
+    "🟡": ("monitor", 50, "yellow signal"),  # YELLOW -> monitor
+}
+
+
+def action_row(row: tuple[Any, ...], now: str) -> Optional[tuple[Any, ...]]:
     # row: (id, ts, source, url, title, score, color)
+    # -> actions insert tuple (ts, signal_id, action_type, priority, title, url, payload, status, dedup_key)
     signal_id, ts, source, url, title, score, color = row
     c = (color or "").strip()
+    rule = ACTION_RULES.get(c)
+    if rule is None:
+        return None
 
-    # RED -> investigate
-    if c == "🔴":
-        return {
-            "signal_id": int(signal_id),
-            "action_type": "investigate",
-            "priority": 90,
-            "title": title or "red signal",
-            "url": url or "",
-            "payload": {"source": source, "color": c, "score": score, "ts": ts},
-        }
-
-    # YELLOW -> monitor
-    if c == "🟡":
-        return {
-            "signal_id": int(signal_id),
-            "action_type": "monitor",
-            "priority": 50,
-            "title": title or "yellow signal",
-            "url": url or "",
-            "payload": {"source": source, "color": c, "score": score, "ts": ts},
-        }
-
-    # GREEN -> no action
-    return None
-
+    action_type, priority, default_title = rule
+    sid = int(signal_id)
+    u = url or ""
+    payload = {"source": source, "color": c, "score": score, "ts": ts}
+    return (
+        now,
+        sid,
+        action_type,
+        priority,
+        title or default_title,
+        u,
+        json.dumps(payload, ensure_ascii=False),
+        "open",
+        dedup_key(action_type, sid, u),
+    )
 
-def main() -> None:
-    con = sqlite3.connect(DB)
-    cur = con.cursor()
 
+def _run(con: sqlite3.Connection, cur: sqlite3.Cursor) -> tuple[int, int, int]:
     last_id = int(get_state(cur, "engine:last_id", "0") or 0)
 
+    # cursor bookkeeping over the rowid range only; no row payloads
+    processed, hi = cur.execute(
+        "SELECT COUNT(*), MAX(id) FROM signals WHERE id > ?", (last_id,)
+    ).fetchone()
+    max_id = max(last_id, int(hi or 0))
+
+    # only rows that can produce an action cross into Python
+    # (instr() is a superset prefilter; action_row stays the exact check)
     rows = cur.execute(
         "SELECT id, ts, source, url, title, score, color "
-        "FROM signals WHERE id > ? ORDER BY id ASC",
-        (last_id,),
+        "FROM signals WHERE id > ? AND id <= ? "
+        "AND (instr(color, '🔴') > 0 OR instr(color, '🟡') > 0) "
+        "ORDER BY id ASC",
+        (last_id, max_id),
     ).fetchall()
 
-    inserted = 0
-    max_id = last_id
-
-    for row in rows:
-        sid = int(row[0])
-        if sid > max_id:
-            max_id = sid
-
-        a = action_for_signal(row)
-        if not a:
-            continue
-
-        dk = dedup_key(a["action_type"], int(a["signal_id"]), a.get("url", ""))
-        try:
-            cur.execute(
-                "INSERT INTO actions(ts, signal_id, action_type, priority, title, url, payload, status, dedup_key) "
-                "VALUES(?,?,?,?,?,?,?,?,?)",
-                (
-                    now_utc_iso(),
-                    a.get("signal_id"),
-                    a["action_type"],
-                    int(a.get("priority", 0)),
-                    a.get("title", ""),
-                    a.get("url", ""),
-                    json.dumps(a.get("payload") or {}, ensure_ascii=False),
-                    "open",
-                    dk,
-                ),
-            )
-            inserted += 1
-        except sqlite3.IntegrityError:
-            # dedup hit
-            pass
+    now = now_utc_iso()  # one timestamp per batch
+    to_insert = [t for t in (action_row(row, now) for row in rows) if t is not None]
+
+    # dedup hits are skipped by the unique dedup_key index, no per-row except
+    before = con.total_changes
+    cur.executemany(
+        "INSERT OR IGNORE INTO actions(ts, signal_id, action_type, priority, title, url, payload, status, dedup_key) "
+        "VALUES(?,?,?,?,?,?,?,?,?)",
+        to_insert,
+    )
+    inserted = con.total_changes - before
 
     set_state(cur, "engine:last_id", str(max_id))
-    con.commit()
-    con.close()
+    return int(processed), inserted, max_id
+
+
+def main() -> None:
+    con = get_connection()
+    cur = con.cursor()
 
-    print(f"[ok] db={DB} processed={len(rows)} inserted={inserted} last_id={max_id}")
+    # one write transaction per run; IMMEDIATE so concurrent runs can't
+    # both read the same engine:last_id
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        processed, inserted, max_id = _run(con, cur)
+        cur.execute("COMMIT")
+    except BaseException:
+        cur.execute("ROLLBACK")
+        raise
+
+    print(f"[ok] db={DB} processed={processed} inserted={inserted} last_id={max_id}")
 
 
 if __name__ == "__main__":
@@ -6,7 +6,7 @@
 Этот скрипт использует Bittensor SDK для получения номера текущего блока,
 количества активных механизмов и распределения эмиссии для указанного
 сабнета (netuid). Полученные данные сохраняются в таблицу `signals`
-используя функцию `save_signal()` из вашего модуля signals. Уровень
+через `_insert_signal_row()` (схема signals из storage). Уровень
 сигнала по умолчанию — 🟡, горизонт — T2.
 """
 from __future__ import annotations
@@ -27,15 +27,24 @@ except ImportError as e:
 
 try:
     # Предполагается, что signals.py находится в PYTHONPATH или в том же каталоге
-    from storage import save_signal
+    from storage import dumps_json, tune_sqlite
 except ImportError:
     raise SystemExit(
         "Ошибка: модуль 'signals' не найден. Убедитесь, что файл signals.py находится рядом со скриптом или добавлен в PYTHONPATH."
     )
 
+_SUB = None
+
+def _client():
+    """Один SubtensorApi на процесс: websocket-handshake к ноде делается один раз."""
+    global _SUB
+    if _SUB is None:
+        _SUB = bt.SubtensorApi()
+    return _SUB
+
 def fetch_bittensor_metrics(netuid: int = 1) -> Dict[str, Any]:
     """Получает метрики из сети Bittensor."""
-    sub = bt.SubtensorApi()
+    sub = _client()
     metrics: Dict[str, Any] = {}
     try:
         current_block: int = sub.block  # текущий номер блока
@@ -65,19 +74,65 @@ def _atlas_db_path() -> str:
     from pathlib import Path as _P
     return str(_P(__file__).resolve().parent / "data" / "atlas.db")
 
-def _insert_signal_row(row: dict) -> None:
-    db = _atlas_db_path()
-    conn = sqlite3.connect(db)
+# schema + INSERT text are static for the process: read/build once, not per row
+_SCHEMA_CACHE: Dict[str, Any] = {}
+_INSERT_SQL: Dict[tuple, str] = {}
+
+# columns _insert_signal_row() can derive from the row when it does not set them
+_DEFAULT_COLS = (
+    "ts", "source", "label", "title", "text", "summary", "origin", "project",
+    "kind", "horizon", "sentiment", "score", "url", "color", "level",
+)
+
+def _signals_schema(cur, db: str):
+    """(insert columns in table order, their set, defaultable columns, NOT NULL fills)."""
+    sch = _SCHEMA_CACHE.get(db)
+    if sch is None:
+        info = cur.execute("PRAGMA table_info(signals)").fetchall()
+        cols = [r[1] for r in info if r[1] != "id"]
+        col_set = frozenset(cols)
+        sch = _SCHEMA_CACHE[db] = (
+            cols,
+            col_set,
+            tuple(c for c in _DEFAULT_COLS if c in col_set),
+            # NOT NULL columns with their SQL default literal unquoted (or None)
+            tuple((r[1], None if r[4] is None else str(r[4]).strip("'"))
+                  for r in info if r[1] != "id" and r[3] == 1),
+        )
+    return sch
+
+def _insert_sql(insert_cols: tuple, dedup_recent: bool = False) -> str:
+    sql = _INSERT_SQL.get((insert_cols, dedup_recent))
+    if sql is None:
+        head = "INSERT OR IGNORE INTO signals ({}) ".format(",".join(insert_cols))
+        marks = ",".join(["?"] * len(insert_cols))
+        if dedup_recent:
+            # dedup check and insert in one statement; params end with (url, window)
+            tail = (
+                f"SELECT {marks} WHERE NOT EXISTS "
+                "(SELECT 1 FROM signals WHERE url = ? AND ts >= datetime('now', ?))"
+            )
+        else:
+            tail = f"VALUES ({marks})"
+        sql = _INSERT_SQL[(insert_cols, dedup_recent)] = head + tail
+    return sql
+
+def _insert_signal_row(row: dict, conn: "sqlite3.Connection | None" = None,
+                       dedup_window: "str | None" = None) -> bool:
+    # conn: reuse the caller's connection
+    # dedup_window: SQLite modifier like '-10 minutes'; skip if the url was stored within it
+    # returns True if a row was written
+    own = conn is None
+    if own:
+        conn = sqlite3.connect(_atlas_db_path())
+        tune_sqlite(conn)
     try:
         cur = conn.cursor()
-        info = cur.execute("PRAGMA table_info(signals)").fetchall()
-        cols = [r[1] for r in info]
-        notnull = {r[1]: r[3] for r in info}  # 1 if NOT NULL
-        dflt = {r[1]: r[4] for r in info}     # default value (SQL literal or None)
+        cols, col_set, default_cols, notnull_fill = _signals_schema(cur, _atlas_db_path())
 
         # meta -> json string if column exists
-        if "meta" in cols and "meta" in row and not isinstance(row["meta"], str):
-            row["meta"] = json.dumps(row["meta"], ensure_ascii=False)
+        if "meta" in col_set and "meta" in row and not isinstance(row["meta"], str):
+            row["meta"] = dumps_json(row["meta"])
 
         base_ts = row.get("ts") or datetime.now(timezone.utc).isoformat()
         base_source = row.get("source") or row.get("origin") or row.get("project") or "bittensor"
@@ -104,48 +159,34 @@ def _insert_signal_row(row: dict) -> None:
             "color": row.get("color") or "neutral",
             "level": row.get("level") or "neutral",
         }
-        for k, v in defaults.items():
-            if k in cols and k not in row:
-                row[k] = v
+        for k in default_cols:
+            if k not in row:
+                row[k] = defaults[k]
 
         # If still missing NOT NULL columns: fill safe placeholder / default
-        for c in cols:
-            if c == "id":
-                continue
-            if notnull.get(c, 0) == 1 and (c not in row or row[c] is None):
-                if dflt.get(c) is not None:
-                    row[c] = str(dflt[c]).strip("'")
-                else:
-                    if c == "ts":
-                        row[c] = base_ts
-                    elif c == "label":
-                        row[c] = base_label
-                    elif c == "source":
-                        row[c] = base_source
-                    elif c == "title":
-                        row[c] = base_title
-                    elif c in ("text", "summary", "url"):
-                        row[c] = ""
-                    elif c == "score":
-                        row[c] = 0.0
-                    else:
-                        row[c] = ""
-
-        insert_cols = [c for c in cols if c != "id" and c in row]
+        if notnull_fill:
+            fallback = {"ts": base_ts, "label": base_label, "source": base_source,
+                        "title": base_title, "score": 0.0}
+            for c, lit in notnull_fill:
+                if row.get(c) is None:
+                    row[c] = lit if lit is not None else fallback.get(c, "")
+
+        insert_cols = [c for c in cols if c in row]
         if not insert_cols:
             raise RuntimeError("signals table: no matching columns to insert")
 
         # IMPORTANT: dedup-friendly
-        sql = "INSERT OR IGNORE INTO signals ({}) VALUES ({})".format(
-            ",".join(insert_cols),
-            ",".join(["?"] * len(insert_cols)),
-        )
-        cur.execute(sql, [row[c] for c in insert_cols])
+        params = [row[c] for c in insert_cols]
+        if dedup_window:
+            params += [row.get("url", ""), dedup_window]
+        cur.execute(_insert_sql(tuple(insert_cols), bool(dedup_window)), params)
         conn.commit()
+        return cur.rowcount > 0
     finally:
-        conn.close()
+        if own:
+            conn.close()
 
-def save_bittensor_metrics_sqlite(metrics, netuid: int = 1) -> None:
+def save_bittensor_metrics_sqlite(metrics, netuid: int = 1) -> bool:
     ts = datetime.now(timezone.utc).isoformat()
     title = f"Bittensor metrics (netuid={netuid})"
     text = json.dumps(metrics, ensure_ascii=False, indent=2)
@@ -168,47 +209,16 @@ def save_bittensor_metrics_sqlite(metrics, netuid: int = 1) -> None:
         "horizon": "T2",
     }
 
-    # dedup: do not write metrics more often than once per 10 minutes
-    try:
-        import sqlite3
-        db = _atlas_db_path()
-        con = sqlite3.connect(db)
-        cur = con.cursor()
-        cur.execute("""
-            SELECT 1
-            FROM signals
-            WHERE url = ?
-              AND ts >= datetime('now','-10 minutes')
-            LIMIT 1
-        """, (row.get("url",""),))
-        if cur.fetchone():
-            print("SKIP: metrics dedup (last 10 min)")
-            return
-    finally:
-        try: con.close()
-        except: pass
-
-    # dedup: do not write metrics more often than once per 10 minutes
+    con = sqlite3.connect(_atlas_db_path())
+    tune_sqlite(con)
     try:
-        import sqlite3
-        db = _atlas_db_path()
-        con = sqlite3.connect(db)
-        cur = con.cursor()
-        cur.execute("""
-            SELECT 1
-            FROM signals
-            WHERE url = ?
-              AND ts >= datetime('now','-10 minutes')
-            LIMIT 1
-        """, (row.get("url",""),))
-        if cur.fetchone():
+        # dedup: do not write metrics more often than once per 10 minutes
+        if not _insert_signal_row(row, con, dedup_window="-10 minutes"):
             print("SKIP: metrics dedup (last 10 min)")
-            return
+            return False
+        return True
     finally:
-        try: con.close()
-        except: pass
-
-    _insert_signal_row(row)
+        con.close()
 # --- /ATLAS PATCH ---
 
 def main() -> None:
@@ -216,7 +226,7 @@ def main() -> None:
     metrics = fetch_bittensor_metrics(netuid=netuid)
     saved = save_bittensor_metrics_sqlite(metrics, netuid=netuid)
     if saved:
-        print(f"Метрики для netuid={netuid} собраны и сохранены:\\n{json.dumps(metrics, ensure_ascii=False, indent=2)}")
+        print(f"Метрики для netuid={netuid} собраны и сохранены:\n{json.dumps(metrics, ensure_ascii=False, indent=2)}")
     else:
         print(f"Метрики для netuid={netuid} собраны (SKIP save, step {ATLAS_METRICS_STEP}):\n{json.dumps(metrics, ensure_ascii=False, indent=2)}")
 
@@ -1,17 +1,33 @@
 import hashlib
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timezone
 import feedparser
 
-DB_PATH = Path("data/atlas.db")
+from storage import DB_PATH, tune_sqlite
+
 SOURCES_PATH = Path("rss_sources.txt")
+MAX_WORKERS = 8
+
+# fixed SQL text: every execute hits the connection's statement cache
+SQL_MARK_SEEN = "INSERT OR IGNORE INTO rss_seen(hash) VALUES(?)"
+SQL_INSERT_SIGNAL = (
+    "INSERT OR IGNORE INTO signals(ts, source, origin, title, text, url, score, color, label) "
+    "VALUES(?,?,?,?,?,?,?,?,?)"
+)
+SQL_SAVE_VALIDATORS = "INSERT OR REPLACE INTO rss_http_cache(url, etag, modified) VALUES(?,?,?)"
 
 def sha(s: str) -> str:
     return hashlib.sha256(s.encode("utf-8")).hexdigest()
 
-def ensure_seen_table():
-    conn = sqlite3.connect(DB_PATH)
+def connect() -> sqlite3.Connection:
+    # one connection per run: page cache stays warm, no connect/teardown per entry
+    conn = sqlite3.connect(DB_PATH, cached_statements=128)
+    tune_sqlite(conn)
+    return conn
+
+def ensure_seen_table(conn):
     cur = conn.cursor()
     cur.execute("""
         CREATE TABLE IF NOT EXISTS rss_seen (
@@ -19,74 +35,101 @@ def ensure_seen_table():
             first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     """)
+    # ETag / Last-Modified per feed URL for conditional GET
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS rss_http_cache (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            modified TEXT
+        )
+    """)
     conn.commit()
-    conn.close()
 
-def already_seen(hv: str) -> bool:
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("SELECT 1 FROM rss_seen WHERE hash=?", (hv,))
-    ok = cur.fetchone() is not None
-    conn.close()
-    return ok
+def load_seen(conn) -> set:
+    return {h for (h,) in conn.execute("SELECT hash FROM rss_seen")}
 
-def mark_seen(hv: str):
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("INSERT OR IGNORE INTO rss_seen(hash) VALUES(?)", (hv,))
-    conn.commit()
-    conn.close()
+def load_validators(conn) -> dict:
+    return {u: (etag, modified) for u, etag, modified in conn.execute("SELECT url, etag, modified FROM rss_http_cache")}
+
+def save_batch(conn, signal_rows, seen_rows, validator_rows=()):
+    # one transaction for the whole run: one commit/fsync instead of two per entry
+    with conn:
+        conn.executemany(SQL_INSERT_SIGNAL, signal_rows)
+        conn.executemany(SQL_MARK_SEEN, seen_rows)
+        conn.executemany(SQL_SAVE_VALIDATORS, validator_rows)
+
+def fetch_feed(url: str, etag=None, modified=None):
+    # feedparser sends If-None-Match / If-Modified-Since; a 304 comes back with no entries.
+    # Sanitizing and relative-URI rewriting re-parse every HTML field; the text
+    # is stored raw and never rendered as HTML, so both passes are skipped.
+    return feedparser.parse(
+        url, etag=etag, modified=modified,
+        resolve_relative_uris=False, sanitize_html=False,
+    )
 
 def parse_ts(entry):
     if hasattr(entry, "published_parsed") and entry.published_parsed:
         return datetime(*entry.published_parsed[:6], tzinfo=timezone.utc).isoformat()
     return datetime.now(timezone.utc).isoformat()
 
-def insert_signal(ts, origin, title, text, url):
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT OR IGNORE INTO signals(ts, source, origin, title, text, url, score, color, label)
-        VALUES(?,?,?,?,?,?,?,?,?)
-    """, (ts, "rss", origin, title, text, url, 0.35, "⚪", "neutral"))
-    conn.commit()
-    conn.close()
-
 def run():
     if not SOURCES_PATH.exists():
         raise SystemExit("rss_sources.txt not found")
 
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    ensure_seen_table()
-
-    for line in SOURCES_PATH.read_text(encoding="utf-8").splitlines():
-        line = line.strip()
-        if not line or line.startswith("#"):
-            continue
-
-        feed = feedparser.parse(line)
-        origin = getattr(feed, "feed", {}).get("title") or line
-
-        for e in getattr(feed, "entries", []):
-            url = e.get("link", "") or ""
-            title = e.get("title", "") or ""
-            text = (
-                (e.get("content") and e.get("content")[0].get("value"))
-                or e.get("summary")
-                or e.get("description")
-                or ""
-            )
-
-            if not text or len(text.strip()) < 120:
-                continue
-
-            hv = sha(url + "||" + title)
-            if already_seen(hv):
-                continue
-
-            ts = parse_ts(e)
-            insert_signal(ts, origin, title, text, url)
-            mark_seen(hv)
+    conn = connect()
+    try:
+        ensure_seen_table(conn)
+
+        signal_rows, seen_rows = [], []
+        # all known hashes in one query; new ones are added as we go
+        seen = load_seen(conn)
+        validators = load_validators(conn)
+        sources = [
+            line.strip()
+            for line in SOURCES_PATH.read_text(encoding="utf-8").splitlines()
+            if line.strip() and not line.strip().startswith("#")
+        ]
+        # download + parse in parallel (I/O-bound), write to SQLite in this thread
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(sources) or 1)) as ex:
+            feeds = list(ex.map(lambda u: fetch_feed(u, *validators.get(u, (None, None))), sources))
+
+        validator_rows = []
+        for line, feed in zip(sources, feeds):
+            if feed.get("status") == 304:
+                continue  # unchanged since the last run: nothing to parse
+            etag, modified = feed.get("etag"), feed.get("modified")
+            if (etag or modified) and (etag, modified) != validators.get(line):
+                validator_rows.append((line, etag, modified))
+
+            origin = getattr(feed, "feed", {}).get("title") or line
+
+            for e in getattr(feed, "entries", []):
+                url = e.get("link", "") or ""
+                title = e.get("title", "") or ""
+                text = (
+                    (e.get("content") and e.get("content")[0].get("value"))
+                    or e.get("summary")
+                    or e.get("description")
+                    or ""
+                )
+
+                if not text or len(text.strip()) < 120:
+                    continue
+
+                hv = sha(url + "||" + title)
+                if hv in seen:
+                    continue
+                seen.add(hv)
+
+                ts = parse_ts(e)
+                # no link -> NULL: NULL urls stay outside the UNIQUE(source, url) index
+                signal_rows.append((ts, "rss", origin, title, text, url or None, 0.35, "⚪", "neutral"))
+                seen_rows.append((hv,))
+
+        save_batch(conn, signal_rows, seen_rows, validator_rows)
+    finally:
+        conn.close()
 
 if __name__ == "__main__":
     run()
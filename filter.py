@@ -28,27 +28,66 @@ DROP_PATTERNS = [
 
 MIN_LEN = 40
 
+try:
+    import re2 as _re2  # google-re2: linear-time automaton, optional
+except ImportError:
+    _re2 = None
+
+def _compile_prefilter(pattern: str):
+    """Fused prefilter regex: re2 when installed, stdlib re otherwise.
+
+    re2's \\b is ASCII-only, so it can only report *more* matches than re on
+    non-ASCII text — every hit is confirmed with the stdlib patterns below."""
+    if _re2 is not None:
+        try:
+            return _re2.compile("(?i)" + pattern)
+        except Exception:
+            pass
+    return re.compile(pattern, re.IGNORECASE)
+
+# Fused, precompiled patterns: one scan per decision instead of one per pattern.
+# A hit is confirmed in list order (first DROP pattern / first project in
+# ANCHORS wins), so results are the same as scanning pattern by pattern.
+_DROP_RES = [re.compile(p, re.IGNORECASE) for p in DROP_PATTERNS]
+DROP_RE = _compile_prefilter("|".join(f"(?:{p})" for p in DROP_PATTERNS))
+
+_PROJECT_RES = [
+    (proj, re.compile("|".join(f"(?:{p})" for p in pats), re.IGNORECASE))
+    for proj, pats in ANCHORS.items()
+]
+PROJECT_RE = _compile_prefilter(
+    "|".join(f"(?:{p})" for pats in ANCHORS.values() for p in pats)
+)
+
+def _first_drop_pattern(t: str):
+    if not DROP_RE.search(t):
+        return None
+    for p, rx in zip(DROP_PATTERNS, _DROP_RES):
+        if rx.search(t):
+            return p
+    return None
+
 def detect_project(text: str) -> Project:
-    t = text.lower()
-    for proj, pats in ANCHORS.items():
-        for p in pats:
-            if re.search(p, t):
-                return proj  # type: ignore
+    if not PROJECT_RE.search(text):
+        return "unknown"
+    for proj, rx in _PROJECT_RES:
+        if rx.search(text):
+            return proj  # type: ignore
     return "unknown"
 
 def filter_event(text: str, source: str = "", author: str = "") -> FilterResult:
     t = (text or "").strip()
-    tlow = t.lower()
+    n = len(t)
 
     reasons: List[str] = []
-    features: Dict[str, object] = {"len": len(t), "source": source, "author": author}
+    features: Dict[str, object] = {"len": n, "source": source, "author": author}
 
-    for p in DROP_PATTERNS:
-        if re.search(p, tlow):
-            reasons.append(f"drop_pattern:{p}")
-            return FilterResult("DROP", "unknown", reasons, features)
+    p = _first_drop_pattern(t)
+    if p is not None:
+        reasons.append(f"drop_pattern:{p}")
+        return FilterResult("DROP", "unknown", reasons, features)
 
-    if len(t) < MIN_LEN:
+    if n < MIN_LEN:
         reasons.append("too_short")
         return FilterResult("DROP", "unknown", reasons, features)
 
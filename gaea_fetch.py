@@ -1,13 +1,18 @@
 #!/usr/bin/env python3
+import hashlib
+import io
 import json
 import re
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from urllib.error import HTTPError
 from urllib.request import Request, urlopen
 import xml.etree.ElementTree as ET
 
-DB_PATH = "data/atlas.db"
+from storage import DB_PATH, dumps_json, tune_sqlite
 UA = "PulseAtlas/0.1 (+local)"
+MAX_WORKERS = 8
 
 # Sources
 GAEA_GITHUB_ORG = "aigaea"
@@ -18,14 +23,93 @@ GAEA_SITE_PAGES = [
     "https://aigaea.net/engine/",
 ]
 
+try:
+    from selectolax.parser import HTMLParser  # optional: single-pass C tokenizer
+except ImportError:
+    HTMLParser = None
+try:
+    import lxml.html as lxml_html  # optional fallback for HTML -> text
+    from lxml import etree as lxml_etree  # optional: streaming RSS parse
+except ImportError:
+    lxml_html = lxml_etree = None
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_WS_RE = re.compile(r"\s+")
+
+def html_to_text(html: str) -> str:
+    """Tag-stripped text with whitespace collapsed to single spaces."""
+    if not html:
+        return ""
+    if HTMLParser is not None:
+        return " ".join(HTMLParser(html).text(separator=" ").split())
+    if lxml_html is not None:
+        try:
+            return " ".join(" ".join(lxml_html.fromstring(html).itertext()).split())
+        except Exception:  # lxml rejects some fragments (only whitespace/comments)
+            pass
+    return _WS_RE.sub(" ", _TAG_RE.sub(" ", html)).strip()
+
 def now_iso():
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
 
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:  # requests is optional: urllib per request otherwise
+    requests = None
+
+_SESSION = None
+
+def http_session():
+    """Shared keep-alive session: api.github.com / medium.com TLS set up once per run."""
+    global _SESSION
+    if _SESSION is None and requests is not None:
+        s = requests.Session()
+        s.headers["User-Agent"] = UA
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_WORKERS)
+        s.mount("https://", adapter)
+        s.mount("http://", adapter)
+        _SESSION = s
+    return _SESSION
+
 def http_get(url: str, timeout=20) -> str:
+    session = http_session()
+    if session is not None:
+        resp = session.get(url, timeout=timeout)
+        resp.raise_for_status()
+        return resp.content.decode("utf-8", errors="replace")
     req = Request(url, headers={"User-Agent": UA})
     with urlopen(req, timeout=timeout) as r:
         return r.read().decode("utf-8", errors="replace")
 
+NOT_MODIFIED = object()  # sentinel: server answered 304, no body was sent
+
+def http_get_conditional(url: str, etag=None, last_modified=None, timeout=20):
+    """GET with If-None-Match/If-Modified-Since; returns (text | NOT_MODIFIED, etag, last_modified)."""
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    session = http_session()
+    if session is not None:
+        resp = session.get(url, headers=headers, timeout=timeout)
+        if resp.status_code == 304:
+            return NOT_MODIFIED, etag, last_modified
+        resp.raise_for_status()
+        text = resp.content.decode("utf-8", errors="replace")
+        return text, resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+    headers["User-Agent"] = UA
+    req = Request(url, headers=headers)
+    try:
+        with urlopen(req, timeout=timeout) as r:
+            text = r.read().decode("utf-8", errors="replace")
+            return text, r.headers.get("ETag"), r.headers.get("Last-Modified")
+    except HTTPError as e:
+        if e.code == 304:
+            return NOT_MODIFIED, etag, last_modified
+        raise
+
 def ensure_schema(conn: sqlite3.Connection):
     cur = conn.cursor()
     cur.execute("""
@@ -34,6 +118,12 @@ def ensure_schema(conn: sqlite3.Connection):
         cursor TEXT
     )
     """)
+    # store() dedups by url alone; storage's unique index is on (source, url)
+    has_signals = cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='signals'"
+    ).fetchone()
+    if has_signals and "url" in {r[1] for r in cur.execute("PRAGMA table_info(signals)")}:
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_signals_url ON signals(url)")
     conn.commit()
 
 def get_cursor(conn, source: str):
@@ -46,16 +136,20 @@ def set_cursor(conn, source: str, cursor: str):
         "ON CONFLICT(source) DO UPDATE SET cursor=excluded.cursor",
         (source, cursor)
     )
-    conn.commit()
+
+_SCHEMA = None  # signals schema is static for the life of the process
 
 def _signals_schema(conn):
-    cols = []
-    notnull = set()
-    for cid, name, ctype, nn, dflt, pk in conn.execute("PRAGMA table_info(signals)"):
-        cols.append(name)
-        if nn == 1:
-            notnull.add(name)
-    return set(cols), notnull
+    global _SCHEMA
+    if _SCHEMA is None:
+        cols = []
+        notnull = set()
+        for cid, name, ctype, nn, dflt, pk in conn.execute("PRAGMA table_info(signals)"):
+            cols.append(name)
+            if nn == 1:
+                notnull.add(name)
+        _SCHEMA = (frozenset(cols), frozenset(notnull))
+    return _SCHEMA
 
 def _pick_col(cols, *names):
     for n in names:
@@ -63,15 +157,26 @@ def _pick_col(cols, *names):
             return n
     return None
 
-def signal_exists(conn, url: str) -> bool:
-    cols, _ = _signals_schema(conn)
-    key = _pick_col(cols, "url", "link", "source_url", "href")
-    if not key:
-        return False
-    row = conn.execute(f"SELECT 1 FROM signals WHERE {key}=? LIMIT 1", (url,)).fetchone()
-    return bool(row)
-
-def insert_signal(conn, payload: dict):
+# SQL text memoized by column set: identical strings hit sqlite3's statement cache
+_SQL_CACHE: dict = {}
+
+def _insert_sql(out_cols: tuple, dedup_col=None) -> str:
+    sql = _SQL_CACHE.get((out_cols, dedup_col))
+    if sql is None:
+        head = f"INSERT INTO signals ({','.join(out_cols)}) "
+        marks = ','.join(['?']*len(out_cols))
+        if dedup_col:
+            # existence check and insert in one statement: one round trip per row
+            tail = f"SELECT {marks} WHERE NOT EXISTS (SELECT 1 FROM signals WHERE {dedup_col}=?)"
+        else:
+            tail = f"VALUES ({marks})"
+        sql = _SQL_CACHE[(out_cols, dedup_col)] = head + tail
+    return sql
+
+def insert_signal(conn, payload: dict, dedup_url=None) -> bool:
+    """Insert one row; with dedup_url, skip it if that url is already stored.
+
+    Returns True if a row was written."""
     cols, notnull = _signals_schema(conn)
 
     url_col  = _pick_col(cols, "url", "link", "source_url", "href")
@@ -87,9 +192,9 @@ def insert_signal(conn, payload: dict):
         if k in cols:
             v = payload.get(k)
             if isinstance(v, (dict, list)):
-                payload[k] = json.dumps(v, ensure_ascii=False)
+                payload[k] = dumps_json(v)
             elif v is None:
-                payload[k] = json.dumps({}, ensure_ascii=False)
+                payload[k] = "{}"
 
     # Ensure text not null
     if text_col and (payload.get(text_col) is None):
@@ -115,15 +220,15 @@ def insert_signal(conn, payload: dict):
             out_cols.append(k)
             out_vals.append(v)
 
-    sql = f"INSERT INTO signals ({','.join(out_cols)}) VALUES ({','.join(['?']*len(out_cols))})"
-    conn.execute(sql, out_vals)
-    conn.commit()
+    dedup_col = url_col if dedup_url is not None else None
+    if dedup_col:
+        out_vals.append(dedup_url)
+    cur = conn.execute(_insert_sql(tuple(out_cols), dedup_col), out_vals)
+    return cur.rowcount > 0
 
 def store(conn, *, source: str, kind: str, title: str, url: str, body: str = "", meta=None, raw=None, ts=None):
     if not ts:
         ts = now_iso()
-    if signal_exists(conn, url):
-        return False
 
     payload = {
         "ts": ts,
@@ -136,10 +241,16 @@ def store(conn, *, source: str, kind: str, title: str, url: str, body: str = "",
         "meta": meta or {},
         "raw": raw or {},
     }
-    insert_signal(conn, payload)
-    return True
+    return insert_signal(conn, payload, dedup_url=url)
 
 # ---------------- GitHub ----------------
+def _fetch_releases(name: str):
+    api_rel = f"https://api.github.com/repos/{GAEA_GITHUB_ORG}/{name}/releases?per_page=20"
+    try:
+        return json.loads(http_get(api_rel))
+    except Exception:
+        return None
+
 def fetch_github(conn):
     source = "gaea/github"
     last = get_cursor(conn, source)  # ISO timestamp
@@ -148,19 +259,18 @@ def fetch_github(conn):
         repos = json.loads(http_get(api_repos))
     except Exception as e:
         print(f"[gaea/github] failed repos: {e}")
-        return 0
+        return None
 
-    new_count = 0
+    rows, cursors = [], []
     newest = last
 
-    for repo in repos:
-        name = repo.get("name")
-        if not name:
-            continue
-        api_rel = f"https://api.github.com/repos/{GAEA_GITHUB_ORG}/{name}/releases?per_page=20"
-        try:
-            rels = json.loads(http_get(api_rel))
-        except Exception:
+    # all /releases requests in flight at once; results handled in repo order
+    names = [repo.get("name") for repo in repos if repo.get("name")]
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(names) or 1)) as ex:
+        all_rels = list(ex.map(_fetch_releases, names))
+
+    for name, rels in zip(names, all_rels):
+        if rels is None:
             continue
         for r in rels:
             html_url = r.get("html_url")
@@ -169,8 +279,7 @@ def fetch_github(conn):
             if last and pub and pub <= last:
                 continue
             if html_url:
-                ok = store(
-                    conn,
+                rows.append(dict(
                     source=source,
                     kind="release",
                     title=f"{name}: {tag}".strip(": "),
@@ -179,30 +288,47 @@ def fetch_github(conn):
                     meta={"repo": name, "tag": tag, "prerelease": bool(r.get("prerelease")), "draft": bool(r.get("draft"))},
                     raw=r,
                     ts=pub or now_iso(),
-                )
-                if ok:
-                    new_count += 1
+                ))
             if pub and ((not newest) or (pub > newest)):
                 newest = pub
 
     if newest and newest != last:
-        set_cursor(conn, source, newest)
-    print(f"[gaea/github] +{new_count} cursor={newest}")
-    return new_count
+        cursors.append((source, newest))
+    return "gaea/github", rows, cursors, f" cursor={newest}"
 
 # ---------------- Medium RSS ----------------
+def _rss_item(it) -> dict:
+    return {
+        "title": (it.findtext("title") or "").strip(),
+        "link": (it.findtext("link") or "").strip(),
+        "pubDate": (it.findtext("pubDate") or "").strip(),
+        "description": (it.findtext("description") or "").strip(),
+    }
+
 def parse_rss_items(xml_text: str):
+    if lxml_etree is not None:
+        return _iter_rss_items(xml_text)
     root = ET.fromstring(xml_text)
     channel = root.find("channel")
     if channel is None:
         return []
+    return [_rss_item(it) for it in channel.findall("item")]
+
+def _iter_rss_items(xml_text: str):
+    """lxml streaming parse: each <item> is dropped from the tree once read."""
     items = []
-    for it in channel.findall("item"):
-        title = (it.findtext("title") or "").strip()
-        link = (it.findtext("link") or "").strip()
-        pub = (it.findtext("pubDate") or "").strip()
-        desc = (it.findtext("description") or "").strip()
-        items.append({"title": title, "link": link, "pubDate": pub, "description": desc})
+    ctx = lxml_etree.iterparse(io.BytesIO(xml_text.encode("utf-8")), tag="item", resolve_entities=False)
+    for _, it in ctx:
+        parent = it.getparent()
+        if parent is None:
+            break
+        channel_root = parent.getparent()
+        # same scope as the DOM path: only <root>/<channel>/<item>
+        if parent.tag == "channel" and channel_root is not None and channel_root.getparent() is None:
+            items.append(_rss_item(it))
+        it.clear()
+        while it.getprevious() is not None:
+            del parent[0]
     return items
 
 def fetch_medium(conn):
@@ -214,21 +340,19 @@ def fetch_medium(conn):
         print(f"[gaea/medium] items={len(items)}")
     except Exception as e:
         print(f"[gaea/medium] failed: {e}")
-        return 0
+        return None
 
-    new_count = 0
+    rows, cursors = [], []
 
     for it in items[:30]:
         link = it.get("link") or ""
         title = it.get("title") or "Medium post"
-        body = re.sub(r"<[^>]+>", " ", it.get("description") or "")
-        body = re.sub(r"\s+", " ", body).strip()
+        body = html_to_text(it.get("description") or "")
         if not link:
             continue
         if last and link == last:
             break
-        ok = store(
-            conn,
+        rows.append(dict(
             source=source,
             kind="post",
             title=title[:300],
@@ -237,36 +361,49 @@ def fetch_medium(conn):
             meta={"feed": GAEA_MEDIUM_FEED},
             raw=it,
             ts=now_iso(),
-        )
-        if ok:
-            new_count += 1
+        ))
 
     if items:
-        set_cursor(conn, source, items[0].get("link") or "")
-    print(f"[gaea/medium] +{new_count}")
-    return new_count
+        cursors.append((source, items[0].get("link") or ""))
+    return "gaea/medium", rows, cursors, ""
 
 # ---------------- Site pages change detect ----------------
 def simple_hash(text: str) -> str:
-    import hashlib
     return hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest()
 
+def load_page_state(raw):
+    """Site cursor -> {"hash", "etag", "last_modified"}; older cursors hold the bare hash."""
+    if not raw:
+        return {}
+    try:
+        state = json.loads(raw)
+    except ValueError:
+        return {"hash": raw}
+    return state if isinstance(state, dict) else {"hash": raw}
+
 def fetch_site_pages(conn):
     source = "gaea/site"
-    total_new = 0
+    rows, cursors = [], []
     for url in GAEA_SITE_PAGES:
         key = f"{source}:{url}"
-        last = get_cursor(conn, key)
+        state = load_page_state(get_cursor(conn, key))
         try:
-            html = http_get(url)
+            html, etag, last_modified = http_get_conditional(
+                url, state.get("etag"), state.get("last_modified")
+            )
         except Exception as e:
             print(f"[gaea/site] failed {url}: {e}")
             continue
+        if html is NOT_MODIFIED:
+            continue
         h = simple_hash(html)
-        if last and h == last:
+        new_state = json.dumps({"hash": h, "etag": etag, "last_modified": last_modified})
+        if h == state.get("hash"):
+            # same content; only refresh the validators if the server rotated them
+            if etag != state.get("etag") or last_modified != state.get("last_modified"):
+                cursors.append((key, new_state))
             continue
-        ok = store(
-            conn,
+        rows.append(dict(
             source=source,
             kind="page_update",
             title=f"GAEA page update: {url}",
@@ -275,29 +412,40 @@ def fetch_site_pages(conn):
             meta={"hash": h},
             raw={"url": url, "hash": h},
             ts=now_iso(),
-        )
-        if ok:
-            total_new += 1
-        set_cursor(conn, key, h)
+        ))
+        cursors.append((key, new_state))
 
-    print(f"[gaea/site] +{total_new}")
-    return total_new
+    return "gaea/site", rows, cursors, ""
 
 def fetch_x_hook(conn):
     print("[gaea/x] hook ready (not fetching yet)")
-    return 0
+    return None
+
+def write_pending(conn, label: str, rows: list, cursors: list, note: str = "") -> int:
+    """Store what a fetch_* collected and move its cursors; returns the new-row count."""
+    new_count = sum(1 for row in rows if store(conn, **row))
+    for key, value in cursors:
+        set_cursor(conn, key, value)
+    print(f"[{label}] +{new_count}{note}")
+    return new_count
 
 def main():
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH, cached_statements=128)
+    tune_sqlite(conn)
     ensure_schema(conn)
 
     total = 0
-    total += fetch_github(conn)
-    total += fetch_medium(conn)
-    total += fetch_site_pages(conn)
-    total += fetch_x_hook(conn)
-
-    conn.close()
+    try:
+        # network first: fetch_* only read cursors, so no write transaction is
+        # open while HTTP requests are in flight
+        pending = [fetch_github(conn), fetch_medium(conn), fetch_site_pages(conn), fetch_x_hook(conn)]
+        # then every insert and cursor update in one short transaction
+        with conn:
+            for p in pending:
+                if p is not None:
+                    total += write_pending(conn, *p)
+    finally:
+        conn.close()
     print(f"[gaea_fetch] done. new={total}")
     return 0
 
@@ -16,10 +16,15 @@ Exit policy:
 from __future__ import annotations
 
 import argparse
+import functools
+import mmap
 import os
 import re
+import shutil
 import subprocess
 import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
@@ -61,12 +66,17 @@ def run_cmd(cmd: List[str], cwd: Path | None = None, timeout: int = 120) -> Tupl
         return 1, f"[EXC] {e}"
 
 
-def git_ls_files(root: Path) -> List[str]:
-    rc, out = run_cmd(["git", "ls-files", "-z"], cwd=root, timeout=30)
+@functools.lru_cache(maxsize=None)
+def _git_ls_files_cached(root: str) -> Tuple[str, ...]:
+    # one git fork + index read per guardian run, shared by all checks
+    rc, out = run_cmd(["git", "ls-files", "-z"], cwd=Path(root), timeout=30)
     if rc != 0:
-        return []
-    items = [p for p in out.split("\0") if p]
-    return items
+        return ()
+    return tuple(p for p in out.split("\0") if p)
+
+
+def git_ls_files(root: Path) -> List[str]:
+    return list(_git_ls_files_cached(str(root)))
 
 
 def check_tracked_path_hygiene(root: Path) -> CheckResult:
@@ -85,20 +95,49 @@ def check_tracked_path_hygiene(root: Path) -> CheckResult:
     return CheckResult(ok=True, severity="OK", title="tracked path hygiene", details="no whitespace in tracked paths")
 
 
+def _compile_chunk(python: str, root: Path, part: List[str]) -> Tuple[int, str]:
+    return run_cmd([python, "-m", "py_compile", *part], cwd=root, timeout=120)
+
+
+def _same_interpreter(python: str) -> bool:
+    try:
+        return os.path.samefile(shutil.which(python) or python, sys.executable)
+    except (OSError, TypeError):
+        return False
+
+
+def _compile_in_process(root: Path, pys: List[str]) -> List[str]:
+    """compile() each file here: no interpreter boot per chunk, no .pyc written."""
+    failed = []
+    for p in pys:
+        try:
+            compile((root / p).read_bytes(), p, "exec", dont_inherit=True)
+        except Exception as e:
+            failed.append("".join(traceback.format_exception_only(type(e), e)).strip())
+    return failed
+
+
 def check_py_compile_tracked(root: Path, python: str) -> CheckResult:
     paths = git_ls_files(root)
     pys = [p for p in paths if p.endswith(".py")]
     if not pys:
         return CheckResult(ok=True, severity="OK", title="py_compile tracked", details="no tracked .py files")
 
-    # compile in chunks to avoid argv limits
+    if _same_interpreter(python):
+        failed = _compile_in_process(root, pys)
+        if failed:
+            return CheckResult(ok=False, severity="FAIL", title="py_compile tracked", details="\n\n".join(failed)[:4000])
+        return CheckResult(ok=True, severity="OK", title="py_compile tracked", details=f"compiled {len(pys)} files")
+
+    # another interpreter (--python): compile in chunks to avoid argv limits; chunks run side by side, one
+    # interpreter per chunk, results kept in chunk order
     failed = []
     chunk = 200
-    for i in range(0, len(pys), chunk):
-        part = pys[i : i + chunk]
-        rc, out = run_cmd([python, "-m", "py_compile", *part], cwd=root, timeout=120)
-        if rc != 0:
-            failed.append(out.strip())
+    parts = [pys[i : i + chunk] for i in range(0, len(pys), chunk)]
+    with ThreadPoolExecutor(max_workers=min(len(parts), os.cpu_count() or 1)) as ex:
+        for rc, out in ex.map(lambda part: _compile_chunk(python, root, part), parts):
+            if rc != 0:
+                failed.append(out.strip())
 
     if failed:
         return CheckResult(ok=False, severity="FAIL", title="py_compile tracked", details="\n\n".join(failed)[:4000])
@@ -123,50 +162,103 @@ except Exception as e:
     return CheckResult(ok=False, severity="FAIL", title="db ping", details=out.strip()[:2000])
 
 
+# compiled once at import; matched against a whole log tail, not line by line
+_ERROR_PATTERNS = [
+    r"traceback",
+    r"\bexception\b",
+    r"\berror\b",
+    r"\bfail(ed)?\b",
+    r"IndentationError",
+    r"SyntaxError",
+    r"No such file or directory",
+]
+_ERROR_RX = re.compile("|".join(_ERROR_PATTERNS).encode(), re.IGNORECASE)
+TAIL_LINES = 400
+TAIL_BYTES = 128 * 1024  # the window never reaches further back than this
+
+
+def _tail_start(buf, size: int, n: int = TAIL_LINES, max_bytes: int = TAIL_BYTES) -> int:
+    """Offset where the last n lines of buf begin (a trailing newline ends, not opens, a line).
+
+    Never earlier than size - max_bytes: if n lines don't fit, the window starts
+    at the first full line inside that range."""
+    floor = max(0, size - max_bytes)
+    pos = size - 1 if size and buf[size - 1] == 0x0A else size
+    start = floor
+    for _ in range(n):
+        pos = buf.rfind(b"\n", floor, pos)
+        if pos < 0:
+            return start if floor else 0
+        start = pos + 1
+    return start
+
+
+def _scan_log(fp: Path, limit: int) -> List[str]:
+    """Error lines from the tail of fp, read through mmap: only the tail pages are touched."""
+    out: List[str] = []
+    with open(fp, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return out  # mmap refuses empty files
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = -1
+            for m in _ERROR_RX.finditer(mm, _tail_start(mm, size)):
+                if m.start() < end:
+                    continue  # this line is already reported
+                start = mm.rfind(b"\n", 0, m.start()) + 1
+                end = mm.find(b"\n", m.end())
+                if end < 0:
+                    end = size
+                out.append(mm[start:end].decode("utf-8", errors="ignore").strip())
+                if len(out) >= limit:
+                    break
+    return out
+
+
+def _walk_files(top: Path):
+    """Yield (path, stat) for regular files under top, like rglob("*") minus dirs.
+
+    DirEntry type info comes from the directory listing itself, so each file
+    costs one stat() (size and mtime together) instead of is_dir + two stats.
+    Symlinked dirs are not descended into, same as rglob."""
+    stack = [str(top)]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        if not entry.is_symlink():
+                            stack.append(entry.path)
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                yield Path(entry.path), st
+
+
 def check_recent_error_patterns(root: Path) -> CheckResult:
     logdir = root / "logs"
     if not logdir.exists():
         return CheckResult(ok=True, severity="OK", title="recent logs scan", details="logs/ not found (skip)")
 
-    # scan last modified files under logs/ (excluding huge dirs)
-    patterns = [
-        r"traceback",
-        r"\bexception\b",
-        r"\berror\b",
-        r"\bfail(ed)?\b",
-        r"IndentationError",
-        r"SyntaxError",
-        r"No such file or directory",
-    ]
-    rx = re.compile("|".join(patterns), re.IGNORECASE)
-
-    files = []
-    for fp in logdir.rglob("*"):
-        if fp.is_dir():
-            continue
-        # skip very large files
-        try:
-            if fp.stat().st_size > 2_000_000:
-                continue
-        except Exception:
-            continue
-        files.append(fp)
+    # skip very large files
+    files = [(st.st_mtime, fp) for fp, st in _walk_files(logdir) if st.st_size <= 2_000_000]
 
     # newest first, take top N
-    files.sort(key=lambda p: p.stat().st_mtime, reverse=True)
-    files = files[:25]
+    files.sort(key=lambda x: x[0], reverse=True)
+    files = [fp for _, fp in files[:25]]
 
     hits = []
     for fp in files:
         try:
-            txt = fp.read_text(encoding="utf-8", errors="ignore")
+            lines = _scan_log(fp, 80 - len(hits))
         except Exception:
             continue
-        for ln in txt.splitlines()[-400:]:
-            if rx.search(ln):
-                hits.append(f"{fp.relative_to(root)}: {ln.strip()}")
-                if len(hits) >= 80:
-                    break
+        hits.extend(f"{fp.relative_to(root)}: {ln}" for ln in lines)
         if len(hits) >= 80:
             break
 
@@ -1,11 +1,9 @@
 #!/usr/bin/env python3
 import sqlite3
 from datetime import datetime, timezone, timedelta
-from pathlib import Path
 import math
-from collections import defaultdict
 
-DB_PATH = Path("data/atlas.db")
+from storage import DB_PATH  # anchored next to the code, not the cwd
 
 # whitelist объектов (ядро + песочница)
 WHITELIST = {"Akash", "Bittensor", "GAEA", "EigenLayer", "Render"}
@@ -31,14 +29,13 @@ def ensure_table(conn):
         PRIMARY KEY (ts, window_days, object)
     )
     """)
+    # покрывающий индекс для окна по ts: агрегаты читают только индекс, без таблицы
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_signals_ts_obj_color_score
+    ON signals(ts, object, color, score)
+    """)
     conn.commit()
 
-def to_float(x):
-    try:
-        return float(x)
-    except Exception:
-        return 0.0
-
 def main():
     if not DB_PATH.exists():
         print("[oii] atlas.db not found")
@@ -52,64 +49,49 @@ def main():
     now = datetime.now(timezone.utc)
     since = (now - timedelta(days=DAYS)).replace(microsecond=0).isoformat()
 
-    # вытянуть сигналы по whitelist
-    rows = conn.execute("""
-        SELECT object, color, score, ts
-        FROM signals
-        WHERE ts >= ?
-          AND COALESCE(object,'') != ''
-    """, (since,)).fetchall()
-
-    # агрегаты
-    per_obj = defaultdict(list)      # (score, ts)
-    risk_cnt = defaultdict(int)
-    total_cnt = defaultdict(int)
-
-    for r in rows:
-        obj = (r["object"] or "").strip()
-        if obj not in WHITELIST:
-            continue
-        sc = to_float(r["score"])
-        ts = r["ts"] or ""
-        per_obj[obj].append((sc, ts))
-        total_cnt[obj] += 1
-        if (r["color"] or "") == "🔴":
-            risk_cnt[obj] += 1
-
-    # vol: дисперсия score по объекту (стд)
-    vol = {}
-    for obj, items in per_obj.items():
-        vals = [x[0] for x in items]
-        if not vals:
-            vol[obj] = 0.0
-            continue
-        m = sum(vals) / len(vals)
-        var = sum((v - m) ** 2 for v in vals) / len(vals)
-        vol[obj] = math.sqrt(var)
+    since3 = (now - timedelta(days=3)).replace(microsecond=0).isoformat()
 
+    # все агрегаты считает SQLite: строки сигналов в Python не тянем.
+    # vol — стд score по объекту, в два прохода (среднее, затем отклонения)
+    marks = ",".join("?" * len(WHITELIST))
+    agg = conn.execute(f"""
+        WITH base AS (
+            SELECT TRIM(object) AS obj,
+                   COALESCE(CAST(score AS REAL), 0.0) AS sc,
+                   color,
+                   ts
+            FROM signals
+            WHERE ts >= ?
+              AND TRIM(object) IN ({marks})
+        ),
+        per_obj AS (
+            SELECT obj,
+                   COUNT(*) AS n_total,
+                   AVG(sc) AS mean,
+                   SUM(CASE WHEN color = '🔴' THEN 1 ELSE 0 END) AS n_risk,
+                   SUM(CASE WHEN ts >= ? THEN 1 ELSE 0 END) AS n_last3
+            FROM base
+            GROUP BY obj
+        )
+        SELECT p.obj AS object, p.n_total, p.n_risk, p.n_last3,
+               AVG((b.sc - p.mean) * (b.sc - p.mean)) AS var
+        FROM per_obj p JOIN base b ON b.obj = p.obj
+        GROUP BY p.obj
+    """, (since, *sorted(WHITELIST), since3)).fetchall()
+
+    vol = {r["object"]: math.sqrt(r["var"] or 0.0) for r in agg}
     max_vol = max(vol.values()) if vol else 1.0
     if max_vol == 0:
         max_vol = 1.0
 
-    # recency: доля событий за последние 3 дня
-    since3 = (now - timedelta(days=3)).replace(microsecond=0).isoformat()
-    last3 = conn.execute("""
-        SELECT object, COUNT(*) c
-        FROM signals
-        WHERE ts >= ?
-          AND COALESCE(object,'') != ''
-        GROUP BY object
-    """, (since3,)).fetchall()
-    last3_cnt = { (r["object"] or "").strip(): int(r["c"]) for r in last3 }
-
     ts_snapshot = now.replace(microsecond=0).isoformat()
 
     out = []
-    for obj, n_total in total_cnt.items():
-        n_risk = risk_cnt.get(obj, 0)
-        risk_share = (n_risk / n_total) if n_total else 0.0
+    for r in agg:
+        obj, n_total = r["object"], int(r["n_total"])
+        risk_share = (r["n_risk"] / n_total) if n_total else 0.0
         vol_norm = (vol.get(obj, 0.0) / max_vol)
-        recency = (last3_cnt.get(obj, 0) / n_total) if n_total else 0.0
+        recency = (r["n_last3"] / n_total) if n_total else 0.0
         oii = W_RISK * risk_share + W_VOL * vol_norm + W_REC * recency
         out.append((ts_snapshot, DAYS, obj, n_total, risk_share, vol_norm, recency, oii))
 
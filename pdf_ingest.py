@@ -4,6 +4,7 @@ from __future__ import annotations
 import argparse
 import hashlib
 import os
+import shutil
 import sqlite3
 import subprocess
 from datetime import datetime, timezone
@@ -19,8 +20,11 @@ def now_utc_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 def sha256_file(p: Path) -> str:
-    h = hashlib.sha256()
     with p.open("rb") as f:
+        if hasattr(hashlib, "file_digest"):
+            # 3.11+: the read/update loop runs in C on the raw fd, no Python-level chunks
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        h = hashlib.sha256()
         for chunk in iter(lambda: f.read(1024 * 1024), b""):
             h.update(chunk)
     return h.hexdigest()
@@ -31,8 +35,13 @@ def ensure_dirs():
     ART.mkdir(parents=True, exist_ok=True)
     PAGES_DIR.mkdir(parents=True, exist_ok=True)
 
+_HAS_PDFTOPPM: bool | None = None  # PATH is looked up once per process
+
 def ensure_tools():
-    if subprocess.call(["/usr/bin/which", "pdftoppm"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0:
+    global _HAS_PDFTOPPM
+    if _HAS_PDFTOPPM is None:
+        _HAS_PDFTOPPM = shutil.which("pdftoppm") is not None
+    if not _HAS_PDFTOPPM:
         raise SystemExit("ERROR: pdftoppm not found. Install: brew install poppler")
 
 def init_db():
@@ -102,19 +111,21 @@ def ingest_one(pdf: Path, source: str = "inbox", url: str = "") -> int:
     conn = sqlite3.connect(str(DB_PATH))
     cur = conn.cursor()
 
-    row = cur.execute("SELECT id, status, pages FROM documents WHERE sha256=?", (sha,)).fetchone()
-    if row and row[1] == "done" and int(row[2] or 0) > 0:
+    # one UPSERT: new sha -> insert, known but unfinished -> reset for a re-render;
+    # an already rendered document is left untouched and RETURNING yields no row
+    row = cur.execute(
+        "INSERT INTO documents(ts, source, url, filename, sha256, status) VALUES(?,?,?,?,?,?) "
+        "ON CONFLICT(sha256) DO UPDATE SET ts=excluded.ts, source=excluded.source, url=excluded.url, "
+        "filename=excluded.filename, status=excluded.status, err='' "
+        "WHERE NOT (documents.status='done' AND COALESCE(documents.pages, 0) > 0) "
+        "RETURNING id",
+        (now_utc_iso(), source, url or "", pdf.name, sha, "new"),
+    ).fetchone()
+    if row is None:
+        doc_id = cur.execute("SELECT id FROM documents WHERE sha256=?", (sha,)).fetchone()[0]
         conn.close()
-        return int(row[0])
-
-    if row:
-        doc_id = int(row[0])
-        cur.execute("UPDATE documents SET ts=?, source=?, url=?, filename=?, status=?, err='' WHERE id=?",
-                    (now_utc_iso(), source, url or "", pdf.name, "new", doc_id))
-    else:
-        cur.execute("INSERT INTO documents(ts, source, url, filename, sha256, status) VALUES(?,?,?,?,?,?)",
-                    (now_utc_iso(), source, url or "", pdf.name, sha, "new"))
-        doc_id = int(cur.lastrowid)
+        return int(doc_id)
+    doc_id = int(row[0])
 
     # wipe prior pages for this doc_id
     cur.execute("DELETE FROM doc_pages WHERE doc_id=?", (doc_id,))
@@ -127,18 +138,16 @@ def ingest_one(pdf: Path, source: str = "inbox", url: str = "") -> int:
 
         run_pdftoppm(pdf, out_prefix)
 
-        imgs = sorted(PAGES_DIR.glob(f"doc{doc_id}-*.png"), key=lambda p: int(p.stem.split("-")[-1]))
-        n_pages = len(imgs)
+        pages = sorted((int(img.stem.split("-")[-1]), img) for img in PAGES_DIR.glob(f"doc{doc_id}-*.png"))
+        n_pages = len(pages)
         if n_pages == 0:
             raise RuntimeError("pdftoppm produced zero pages")
 
         cur.execute("UPDATE documents SET status=?, pages=? WHERE id=?", ("done", n_pages, doc_id))
 
-        # store pages (no OCR for now — text empty)
-        for img in imgs:
-            page = int(img.stem.split("-")[-1])
-            cur.execute("INSERT INTO doc_pages(doc_id, page, img_path, text, ocr_used) VALUES(?,?,?,?,0)",
-                        (doc_id, page, str(img), ""))
+        # store pages (no OCR for now — text empty); one executemany, committed with the status
+        cur.executemany("INSERT INTO doc_pages(doc_id, page, img_path, text, ocr_used) VALUES(?,?,?,?,0)",
+                        [(doc_id, page, str(img), "") for page, img in pages])
 
         conn.commit()
         conn.close()
@@ -1,16 +1,27 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import hashlib
 import time
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
 
 import requests
+from requests.adapters import HTTPAdapter
 import feedparser
 
+try:
+    from lxml import etree  # optional: libxml2 parser for plain RSS 2.0 feeds
+except ImportError:
+    etree = None
+
 import storage
 
 HN_RSS = "https://news.ycombinator.com/rss"
+USER_AGENT = "atlas/1.0 (+rss)"
+MAX_WORKERS = 8
 
 
 def read_sources(p: Path) -> list[str]:
@@ -32,14 +43,25 @@ def read_sources(p: Path) -> list[str]:
     return uniq
 
 
-def fetch_url(url: str, timeout: int = 25) -> str:
+def make_session() -> requests.Session:
+    # keep-alive: repeat hosts reuse TCP+TLS across sources and retries
+    s = requests.Session()
+    s.headers["User-Agent"] = USER_AGENT
+    adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
+
+def fetch_url(url: str, timeout: int = 25, session: requests.Session | None = None) -> str:
+    http = session or requests
     last = None
     for attempt in range(4):
         try:
-            r = requests.get(
+            r = http.get(
                 url,
                 timeout=timeout,
-                headers={"User-Agent": "atlas/1.0 (+rss)"},
+                headers={"User-Agent": USER_AGENT},
             )
             r.raise_for_status()
             return r.text
@@ -49,6 +71,57 @@ def fetch_url(url: str, timeout: int = 25) -> str:
     raise last  # type: ignore[misc]
 
 
+def fetch_all(sources: list[str]) -> list[tuple[str | None, Exception | None]]:
+    """Download every source concurrently; (xml, error) per source, in input order."""
+    def one(src: str):
+        try:
+            return fetch_url(src, session=session), None
+        except Exception as e:
+            return None, e
+
+    with make_session() as session, ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(sources))) as ex:
+        return list(ex.map(one, sources))
+
+
+DC_DATE = "{http://purl.org/dc/elements/1.1/}date"
+
+
+class Entry:
+    """The feedparser entry fields normalize_entry() reads."""
+    __slots__ = ("link", "title", "summary", "comments", "published")
+
+    def __init__(self, it) -> None:
+        self.link = (it.findtext("link") or "").strip()
+        self.title = (it.findtext("title") or "").strip()
+        self.summary = (it.findtext("description") or "").strip()
+        self.comments = (it.findtext("comments") or "").strip()
+        self.published = (it.findtext("pubDate") or it.findtext(DC_DATE) or "").strip()
+
+
+def parse_feed_lxml(xml: str) -> list[Entry] | None:
+    """Items of an RSS 2.0 feed via lxml; None means "let feedparser handle it"."""
+    if etree is None:
+        return None
+    try:
+        parser = etree.XMLParser(recover=True, resolve_entities=False, no_network=True, encoding="utf-8")
+        root = etree.fromstring(xml.encode("utf-8"), parser)
+    except Exception:
+        return None
+    if root is None or root.tag != "rss":
+        return None  # Atom, RSS 1.0/RDF, ...: feedparser knows them
+    channel = root.find("channel")
+    if channel is None:
+        return None
+    return [Entry(it) for it in channel.iterfind("item")]
+
+
+def parse_entries(xml: str) -> list:
+    entries = parse_feed_lxml(xml)
+    if entries is None:
+        entries = feedparser.parse(xml).entries
+    return entries
+
+
 def normalize_entry(src: str, e) -> tuple[str, str, str, str]:
     src = (src or "").strip()
     ext = getattr(e, "link", "") or ""
@@ -76,6 +149,33 @@ def ensure_columns(con: sqlite3.Connection) -> None:
     con.commit()
 
 
+def ensure_cache_table(con: sqlite3.Connection) -> None:
+    # хэш последнего обработанного тела фида: тот же XML повторно не разбираем
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS rss_cache(source TEXT PRIMARY KEY, body_hash BLOB, ts TEXT)"
+    )
+    con.commit()
+
+
+def load_body_hashes(con: sqlite3.Connection) -> dict[str, bytes]:
+    return {src: h for src, h in con.execute("SELECT source, body_hash FROM rss_cache")}
+
+
+def save_body_hashes(rows: list[tuple[str, bytes, str]]) -> None:
+    con = sqlite3.connect(storage.DB_PATH)
+    try:
+        with con:
+            con.executemany(
+                "INSERT OR REPLACE INTO rss_cache(source, body_hash, ts) VALUES(?,?,?)", rows
+            )
+    finally:
+        con.close()
+
+
+def body_hash(xml: str) -> bytes:
+    return hashlib.blake2b(xml.encode("utf-8", errors="replace"), digest_size=16).digest()
+
+
 def main() -> int:
     storage.init_db()
 
@@ -85,26 +185,39 @@ def main() -> int:
         return 2
 
     # ensure optional cols exist
-    con = sqlite3.connect("data/atlas.db")
+    con = sqlite3.connect(storage.DB_PATH)
     try:
         ensure_columns(con)
+        ensure_cache_table(con)
+        last_hash = load_body_hashes(con)
     finally:
         con.close()
 
     inserted = 0
     ignored = 0
+    unchanged = 0
+    new_hashes: list[tuple[str, bytes, str]] = []
+    now = datetime.now(timezone.utc).isoformat()
 
-    for src in sources:
-        try:
-            xml = fetch_url(src)
-            feed = feedparser.parse(xml)
+    # network waits overlap; parsing and DB writes stay in this thread, in source order
+    fetched = fetch_all(sources)
 
-            for e in feed.entries[:50]:
+    for src, (xml, err) in zip(sources, fetched):
+        try:
+            if err is not None:
+                raise err
+            h = body_hash(xml)
+            if last_hash.get(src) == h:
+                unchanged += 1  # тот же ответ, что в прошлый раз: всё уже сохранено
+                continue
+
+            rows = []
+            for e in parse_entries(xml)[:50]:
                 url, title, summary, raw = normalize_entry(src, e)
                 if not url:
                     continue
 
-                rc = storage.save_signal(
+                rows.append(
                     {
                         "source": src,
                         "title": title,
@@ -114,15 +227,20 @@ def main() -> int:
                         "text": (summary or title or ""),
                     }
                 )
-                if rc == 1:
-                    inserted += 1
-                else:
-                    ignored += 1
+
+            # one connection + one transaction per feed
+            rc = storage.save_signals_many(rows)
+            inserted += rc
+            ignored += len(rows) - rc
+            new_hashes.append((src, h, now))
 
         except Exception as ex:
             print(f"WARN: source failed: {src} :: {ex}")
 
-    print(f"OK: rss_fetch inserted={inserted} ignored={ignored}")
+    if new_hashes:
+        save_body_hashes(new_hashes)
+
+    print(f"OK: rss_fetch inserted={inserted} ignored={ignored} unchanged={unchanged}")
     return 0
 
 
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
-import subprocess, sys, os, glob
+import subprocess, sys, os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 ROOT = Path(__file__).resolve().parent
@@ -10,6 +11,30 @@ def run(cmd):
     if r != 0:
         raise SystemExit(r)
     return r
+
+def run_captured(cmd):
+    # вывод копим целиком: параллельные скрипты не перемешивают строки
+    r = subprocess.run(cmd, cwd=str(ROOT), stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                       text=True, errors="replace")
+    return r.returncode, r.stdout
+
+def run_parallel(cmds):
+    """Сетевые fetch-скрипты параллельно; вывод блоком по завершении, SystemExit — как у run()."""
+    if not cmds:
+        return
+    rcs = {}
+    with ThreadPoolExecutor(max_workers=len(cmds)) as ex:
+        futures = {ex.submit(run_captured, cmd): i for i, cmd in enumerate(cmds)}
+        for f in as_completed(futures):
+            i = futures[f]
+            rcs[i], out = f.result()
+            print(f"[run] {' '.join(cmds[i])}", flush=True)
+            print(out, end="", flush=True)
+    # первый упавший в порядке запуска задаёт код выхода
+    for i in range(len(cmds)):
+        if rcs[i] != 0:
+            raise SystemExit(rcs[i])
+
 def main():
     # Ensure DB schema exists
     try:
@@ -25,26 +50,24 @@ def main():
     else:
         print("[skip] gaea_fetch.py not found")
 
-    # 2) Автопоиск остальных fetch-скриптов (кроме dashboard и oii)
-    candidates = []
-    for pat in ("fetch_*.py", "*_fetch.py", "rss_*.py"):
-        candidates += glob.glob(str(ROOT / pat))
+    # 2) Автопоиск остальных fetch-скриптов (кроме dashboard и oii):
+    # один проход scandir вместо трёх glob; скрытые файлы glob не видит — мы тоже
+    with os.scandir(ROOT) as it:
+        names = [e.name for e in it if e.is_file() and not e.name.startswith(".")]
 
-    # убрать дубликаты / мусор
+    # убрать мусор
     bad = {"dashboard.py", "gaea_fetch.py", "oii_snapshot.py", "run_all.py"}
-    uniq = []
-    for p in sorted(set(map(lambda x: Path(x).name, candidates))):
-        if p in bad:
-            continue
+    uniq = sorted(
+        n for n in names
+        if n.endswith(".py")
+        and (n.startswith("fetch_") or n.endswith("_fetch.py") or n.startswith("rss_"))
+        and n not in bad
         # не запускаем явно UI/сервисы
-        if "dashboard" in p.lower():
-            continue
-        uniq.append(p)
-
-    for p in uniq:
-        # запускаем только если файл реально существует
-        if (ROOT / p).exists():
-            run([py, p])
+        and "dashboard" not in n.lower()
+    )
+
+    # GAEA до, OII после — по порядку
+    run_parallel([[py, p] for p in uniq])
 
     # 3) Пересчёт OII
     if (ROOT / "oii_snapshot.py").exists():
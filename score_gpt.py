@@ -1,3 +1,49 @@
+import re
+
+try:
+    import ahocorasick  # pyahocorasick, optional
+except ImportError:
+    ahocorasick = None
+
+NEGATIVE = [
+    "exploit",
+    "rug",
+    "collapse",
+    "shutdown",
+    "attack",
+    "breach",
+    "exit scam",
+    "critical bug",
+    "halted",
+    "drift"
+]
+
+WARNING = [
+    "delay",
+    "change",
+    "adjust",
+    "update",
+    "migration",
+    "incentive",
+    "emission",
+    "vote",
+    "governance",
+    "proposal"
+]
+
+# built once at import: one scan of the text instead of up to 20 `word in t`
+if ahocorasick is not None:
+    _AUTOMATON = ahocorasick.Automaton()
+    for _w in WARNING:
+        _AUTOMATON.add_word(_w, "YELLOW")
+    for _w in NEGATIVE:
+        _AUTOMATON.add_word(_w, "RED")
+    _AUTOMATON.make_automaton()
+else:
+    _NEGATIVE_RE = re.compile("|".join(map(re.escape, NEGATIVE)))
+    _WARNING_RE = re.compile("|".join(map(re.escape, WARNING)))
+
+
 def score_text(text: str) -> str:
     """
     Very simple heuristic scoring.
@@ -6,40 +52,18 @@ def score_text(text: str) -> str:
 
     t = text.lower()
 
-    negative = [
-        "exploit",
-        "rug",
-        "collapse",
-        "shutdown",
-        "attack",
-        "breach",
-        "exit scam",
-        "critical bug",
-        "halted",
-        "drift"
-    ]
-
-    warning = [
-        "delay",
-        "change",
-        "adjust",
-        "update",
-        "migration",
-        "incentive",
-        "emission",
-        "vote",
-        "governance",
-        "proposal"
-    ]
-
-    for word in negative:
-        if word in t:
-            return "RED"
-
-    for word in warning:
-        if word in t:
-            return "YELLOW"
+    if ahocorasick is not None:
+        best = "GREEN"
+        for _, tag in _AUTOMATON.iter(t):
+            if tag == "RED":
+                return "RED"
+            best = "YELLOW"
+        return best
 
+    if _NEGATIVE_RE.search(t):
+        return "RED"
+    if _WARNING_RE.search(t):
+        return "YELLOW"
     return "GREEN"
 
 
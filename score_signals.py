@@ -1,8 +1,16 @@
+import re
 import sqlite3
 from datetime import datetime, timezone
 from urllib.parse import urlparse
 
-DB = "data/atlas.db"
+from storage import DB_PATH
+
+try:
+    import ahocorasick  # pyahocorasick, optional
+except ImportError:
+    ahocorasick = None
+
+DB = str(DB_PATH)  # storage anchors it next to the code, not the cwd
 
 GREEN = "green"
 YELLOW = "yellow"
@@ -32,6 +40,40 @@ HIGH_SIGNAL_DOMAINS = {
     "lwn.net": 0.68,
 }
 
+# keyword -> buckets it belongs to; classify() only needs which buckets were hit
+_BUCKETS: dict[str, frozenset] = {}
+for _bucket, _words in ((RED, KEYWORDS_RED), (GREEN, KEYWORDS_GREEN), (YELLOW, KEYWORDS_YELLOW)):
+    for _w in _words:
+        _BUCKETS[_w] = _BUCKETS.get(_w, frozenset()) | {_bucket}
+
+if ahocorasick is not None:
+    # one automaton pass over the text for all three keyword lists
+    _AUTOMATON = ahocorasick.Automaton()
+    for _w, _b in _BUCKETS.items():
+        _AUTOMATON.add_word(_w, _b)
+    _AUTOMATON.make_automaton()
+
+    def _hit_buckets(t: str) -> set[str]:
+        hits: set[str] = set()
+        for _, b in _AUTOMATON.iter(t):
+            hits |= b
+        return hits
+else:
+    # one regex pass instead of up to ~50 `k in t`: the lookahead yields the
+    # longest keyword at each position, shorter ones inside it come via _CONTAINED
+    _WORDS_RE = re.compile(
+        "(?=({}))".format("|".join(map(re.escape, sorted(_BUCKETS, key=len, reverse=True))))
+    )
+    _CONTAINED = {
+        w: frozenset().union(*(b for k, b in _BUCKETS.items() if k in w)) for w in _BUCKETS
+    }
+
+    def _hit_buckets(t: str) -> set[str]:
+        hits: set[str] = set()
+        for w in set(_WORDS_RE.findall(t)):
+            hits |= _CONTAINED[w]
+        return hits
+
 def norm_text(*parts: str) -> str:
     return " ".join([p.strip() for p in parts if p and p.strip()]).lower()
 
@@ -40,19 +82,23 @@ def domain_score(url: str) -> float:
         host = urlparse(url).netloc.lower()
         if host.startswith("www."):
             host = host[4:]
-        for d, sc in HIGH_SIGNAL_DOMAINS.items():
-            if host == d or host.endswith("." + d):
+        # host and each parent suffix probed in the dict: a.b.github.com -> b.github.com -> github.com
+        while True:
+            sc = HIGH_SIGNAL_DOMAINS.get(host)
+            if sc is not None:
                 return sc
-        return 0.45
+            dot = host.find(".")
+            if dot < 0:
+                return 0.45
+            host = host[dot + 1:]
     except Exception:
         return 0.40
 
 def classify(text: str) -> tuple[float, str, str]:
-    t = text.lower()
-
-    hit_red = any(k in t for k in KEYWORDS_RED)
-    hit_green = any(k in t for k in KEYWORDS_GREEN)
-    hit_yellow = any(k in t for k in KEYWORDS_YELLOW)
+    hits = _hit_buckets(text.lower())
+    hit_red = RED in hits
+    hit_green = GREEN in hits
+    hit_yellow = YELLOW in hits
 
     if hit_red and not hit_green:
         return 0.72, RED, "risk/pressure"
@@ -95,9 +141,9 @@ def main(limit: int = 200) -> int:
         con.close()
         return 0
 
-    updated = 0
     now = datetime.now(timezone.utc).isoformat()
 
+    updates = []
     for sid, source, title, text, summary, url, raw in rows:
         blob = norm_text(title or "", text or "", summary or "")
         base = domain_score(url or "")
@@ -107,18 +153,20 @@ def main(limit: int = 200) -> int:
         score = clamp(0.5 * base + 0.5 * kscore)
 
         rationale = f"{label}; score={score:.2f}; source={source}; t={now}"
-        cur.execute(
+        updates.append((float(score), color, label, rationale, sid))
+
+    # one executemany in one transaction
+    with con:
+        con.executemany(
             """
             UPDATE signals
             SET score=?, color=?, label=?, rationale=?
             WHERE id=?
             """,
-            (float(score), color, label, rationale, sid),
+            updates,
         )
-        updated += 1
-
-    con.commit()
     con.close()
+    updated = len(updates)
     print(f"OK: score_signals updated={updated}")
     return 0
 
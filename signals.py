@@ -1,2 +1,17 @@
 # Compatibility shim: some scripts do "import signals"
-from storage import init_db, save_signal, save_entry
+from datetime import datetime, timezone
+
+from storage import init_db, ingest, migrate_page_layout, save_signal, save_signals_many, save_entries, save_entry
+
+
+def sample_items(n: int = 5):
+    """n синтетических сигналов для `signals_cli ingest sample`; url стабильны, повторный прогон — дубли."""
+    ts = datetime.now(timezone.utc).isoformat()
+    for i in range(n):
+        yield {
+            "ts": ts,
+            "source": "sample",
+            "title": f"sample #{i}",
+            "text": f"sample signal #{i}",
+            "url": f"https://example.com/sample/{i}",
+        }
@@ -2,33 +2,59 @@
 from __future__ import annotations
 
 import argparse
+import functools
 import sqlite3
 from pathlib import Path
 
-from signals import ingest, sample_items
+from signals import ingest, init_db, migrate_page_layout, sample_items
 
-DB_PATH = Path("data/atlas.db")
+# the file storage writes to (next to the code, not the cwd); resolved once at import
+DB_PATH = Path(__file__).resolve().parent / "data" / "atlas.db"
 
 def cmd_ingest(args):
     if args.source == "sample":
-        stats = ingest(sample_items(args.n))
+        init_db()
+        stats = ingest(sample_items(args.n), fast_load=args.fast_load)
         print(f"OK: ingest sample -> inserted={stats['inserted']} ignored={stats['ignored']}")
         return
     raise SystemExit(f"Unknown source: {args.source}")
 
+@functools.lru_cache(maxsize=None)
+def _connect_ro() -> sqlite3.Connection:
+    """Соединение только на чтение: не берёт write-lock (ingest не ждёт), читает через mmap; одно на процесс."""
+    con = sqlite3.connect(DB_PATH.as_uri() + "?mode=ro", uri=True)
+    con.execute("PRAGMA query_only=1")
+    con.execute("PRAGMA mmap_size=268435456")
+    return con
+
 def cmd_stats(_args):
-    con = sqlite3.connect(str(DB_PATH))
-    cur = con.cursor()
-    cur.execute("""
-        SELECT
-          COUNT(*) AS total,
-          COUNT(DISTINCT url) AS uniq_url
-        FROM signals
-        WHERE url IS NOT NULL AND url != '';
-    """)
-    total, uniq_url = cur.fetchone()
+    if not DB_PATH.exists():
+        raise SystemExit(f"No database: {DB_PATH}")
+    con = _connect_ro()
+    try:
+        # счётчики ведут триггеры (storage.init_db): два чтения по PK
+        counters = dict(con.execute("SELECT name, value FROM stats_counters"))
+        total, uniq_url = counters["total"], counters["uniq_url"]
+    except (sqlite3.OperationalError, KeyError):
+        # база ещё без счётчиков (init_db не запускался): полный проход
+        total, uniq_url = con.execute("""
+            SELECT
+              COUNT(*) AS total,
+              COUNT(DISTINCT url) AS uniq_url
+            FROM signals
+            WHERE url IS NOT NULL AND url != '';
+        """).fetchone()
     print(f"signals: total={total} uniq_url={uniq_url}")
-    con.close()
+
+def cmd_migrate(_args):
+    if not DB_PATH.exists():
+        raise SystemExit(f"No database: {DB_PATH}")
+    # VACUUM переписывает весь файл: сборщики и дашборд должны быть остановлены
+    try:
+        migrated = migrate_page_layout(str(DB_PATH))
+    except sqlite3.OperationalError as e:
+        raise SystemExit(f"FAIL: page layout migration ({e}); stop writers/dashboard and retry")
+    print("OK: page layout migrated" if migrated else "OK: page layout already current")
 
 def main():
     p = argparse.ArgumentParser(prog="signals_cli")
@@ -37,11 +63,16 @@ def main():
     p_ing = sub.add_parser("ingest", help="Ingest signals from a source")
     p_ing.add_argument("source", choices=["sample"])
     p_ing.add_argument("--n", type=int, default=5)
+    p_ing.add_argument("--fast-load", action="store_true",
+                       help="initial load into an empty signals table: build in memory, write once via backup")
     p_ing.set_defaults(func=cmd_ingest)
 
     p_stats = sub.add_parser("stats", help="Show signals stats")
     p_stats.set_defaults(func=cmd_stats)
 
+    p_mig = sub.add_parser("migrate", help="One-off: rewrite an old atlas.db to page_size 8192 + incremental auto_vacuum")
+    p_mig.set_defaults(func=cmd_migrate)
+
     args = p.parse_args()
     args.func(args)
 
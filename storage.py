@@ -1,13 +1,18 @@
 import sqlite3
 from pathlib import Path
 
-DB_PATH = Path("data/atlas.db")
+# рядом с кодом, а не от cwd; resolve() — readlink/stat на каждый компонент, поэтому один раз
+DB_PATH = Path(__file__).resolve().parent / "data" / "atlas.db"
 
 def init_db():
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
     conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
+    # действуют только на новый (пустой) файл, до первой таблицы; старые файлы
+    # переводит migrate_page_layout (VACUUM, `signals_cli migrate`)
+    cur.execute("PRAGMA page_size=8192")
+    cur.execute("PRAGMA auto_vacuum=INCREMENTAL")
     cur.execute("""
     CREATE TABLE IF NOT EXISTS journal (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -36,15 +41,29 @@ def init_db():
     conn.commit()
     conn.close()
 
+def save_entries(entries) -> int:
+    """Пакет записей журнала (project, note, signal): один executemany, один COMMIT."""
+    entries = list(entries)
+    if not entries:
+        return 0
+    with _CONN_LOCK:
+        conn = _get_conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO journal (project, note, signal) VALUES (?, ?, ?)",
+                entries
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    return len(entries)
+
 def save_entry(project: str, note: str, signal: str):
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO journal (project, note, signal) VALUES (?, ?, ?)",
-        (project, note, signal)
-    )
-    conn.commit()
-    conn.close()
+    # одиночная запись; в циклах — save_entries
+    save_entries([(project, note, signal)])
+
 def save_signal(
     ts: str,
     source: str,
@@ -71,140 +90,503 @@ def save_signal(
 
 # --- ATLAS V2 STORAGE PATCH (dedup + ignore) ---
 # Цель:
-# 1) Глобальный дедуп по url (UNIQUE INDEX + INSERT OR IGNORE)
-# 2) Не падать на дублях / NOT NULL
+# 1) Глобальный дедуп по url (UNIQUE INDEX + ON CONFLICT DO NOTHING)
+# 2) Не падать на дублях; NOT NULL закрывают дефолты, а не затычки
 # 3) Совместимость: принимать любые kwargs (project/origin/source/label/color/...)
 
+import atexit
+import os
 import sqlite3
 import json
+import threading
 from datetime import datetime, timezone
+from itertools import chain, islice, repeat
+from typing import Iterable
+
+try:
+    import orjson  # optional: faster encoder for the meta column
+except ImportError:
+    orjson = None
+
+def dumps_json(obj) -> str:
+    """JSON text for meta/raw blobs (shared by the collectors): orjson when installed, else json."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode("utf-8")
+        except TypeError:  # non-str keys, ints > 64 bit, ...: json handles them
+            pass
+    return json.dumps(obj, ensure_ascii=False)
 
 # сохраним старые функции, если они уже были определены выше
 _try_old_init_db = globals().get("init_db")
 _try_old_atlas_db_path = globals().get("_atlas_db_path")
 
+def tune_sqlite(conn: sqlite3.Connection) -> None:
+    """Общий профиль для всех писателей atlas.db: WAL, NORMAL, page cache и mmap."""
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+    except sqlite3.DatabaseError:
+        pass  # read-only mount: остаёмся на текущем journal_mode
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA busy_timeout=5000")
+
+def connect_db(db=None, **kwargs) -> sqlite3.Connection:
+    """sqlite3.connect + tune_sqlite: journal_mode хранится в файле, остальное живёт
+    только в соединении, поэтому профиль применяется к каждому новому соединению."""
+    conn = sqlite3.connect(db or _atlas_db_path_v2(), **kwargs)
+    tune_sqlite(conn)
+    # умолчания сборок SQLite различаются, поэтому выставляем явно.
+    # Внешний ключ в atlas.db один — doc_pages.doc_id -> documents(id) (pdf_ingest);
+    # эти соединения doc_pages не пишут, а pdf_ingest вставляет documents раньше
+    # страниц, так что проверку FK не включаем: signals-пути не платят за неё.
+    # Триггеры счётчиков не рекурсивны
+    conn.execute("PRAGMA foreign_keys=OFF")
+    conn.execute("PRAGMA legacy_alter_table=OFF")
+    conn.execute("PRAGMA recursive_triggers=OFF")
+    return conn
+
+# одно соединение на процесс: без connect()/PRAGMA на каждый вызов, кэш страниц
+# прогревается между вызовами. autocommit (isolation_level=None) — пакетные пути
+# сами открывают BEGIN IMMEDIATE; RLock сериализует потоки
+_CONN: sqlite3.Connection | None = None
+_CONN_LOCK = threading.RLock()
+
+def _get_conn() -> sqlite3.Connection:
+    global _CONN
+    with _CONN_LOCK:
+        if _CONN is None:
+            _CONN = connect_db(isolation_level=None, check_same_thread=False, cached_statements=256)
+            atexit.register(_close_conn)
+        return _CONN
+
+# PRAGMA optimize: статистика планировщика (ANALYZE) обновляется только там, где устарела;
+# на закрытии соединения и, для долгоживущих процессов, каждые N вставленных строк
+_OPTIMIZE_EVERY = 10_000
+_since_optimize = 0
+
+def _optimize(conn: sqlite3.Connection) -> None:
+    global _since_optimize
+    _since_optimize = 0
+    try:
+        conn.execute("PRAGMA optimize")
+    except sqlite3.Error:
+        pass  # только подсказка планировщику: занятая/read-only БД не повод падать
+
+def _close_conn() -> None:
+    global _CONN
+    with _CONN_LOCK:
+        if _CONN is not None:
+            try:
+                _optimize(_CONN)
+            finally:
+                _CONN.close()
+                _CONN = None
+
+_DB_PATH_V2 = str(DB_PATH)  # путь считается один раз при импорте, не на каждый вызов
+
 def _atlas_db_path_v2() -> str:
     if callable(_try_old_atlas_db_path):
         return _try_old_atlas_db_path()
-    from pathlib import Path as _P
-    return str(_P(__file__).resolve().parent / "data" / "atlas.db")
+    return _DB_PATH_V2
+
+_PAGE_SIZE = 8192
+_AUTO_VACUUM_INCREMENTAL = 2
+
+def migrate_page_layout(db: str | None = None) -> bool:
+    """Старый файл -> page_size 8192 + auto_vacuum=INCREMENTAL. True, если файл переписан.
+
+    Разовый шаг (`signals_cli migrate`), не часть init_db: VACUUM переписывает
+    всю БД и требует, чтобы её больше никто не держал открытой (сборщики,
+    дашборд). Оба параметра у существующей БД меняются только через VACUUM,
+    а page_size — ещё и не в WAL: DELETE -> PRAGMA -> VACUUM -> WAL.
+    Занятый файл — sqlite3.OperationalError вызывающему."""
+    db = db or _atlas_db_path_v2()
+    if not os.path.exists(db):
+        return False  # новый файл: прагмы выставит старый init_db до CREATE TABLE
+    conn = sqlite3.connect(db, isolation_level=None)
+    try:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        if page_size == _PAGE_SIZE and auto_vacuum == _AUTO_VACUUM_INCREMENTAL:
+            return False
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.execute(f"PRAGMA page_size={_PAGE_SIZE}")
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA journal_mode=WAL")
+        return True
+    finally:
+        conn.close()
 
 def init_db():
     # вызвать старый init_db (если был)
     if callable(_try_old_init_db):
         _try_old_init_db()
 
+    _SCHEMA_CACHE.clear()
+
     # гарантировать индекс дедупа
-    db = _atlas_db_path_v2()
-    conn = sqlite3.connect(db)
+    # WAL включается здесь, после CREATE TABLE: page_size нового файла уже зафиксирован
+    conn = connect_db()
     try:
         cur = conn.cursor()
-        # частичный UNIQUE по url (только непустые)
+        # UNIQUE(source, url) без WHERE: пустой url хранится как NULL, а NULL-ы
+        # UNIQUE не сравнивает — строки без url не дедупятся, как и при старом
+        # частичном индексе. Миграция (''->NULL, дубли, замена индекса) — один раз
+        has_idx = cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='index' AND name='idx_signals_source_url'"
+        ).fetchone()
+        if not has_idx:
+            cur.execute("UPDATE signals SET url=NULL WHERE url=''")
+            # старый частичный индекс не видел source='' (и старые БД без него вовсе):
+            # такие дубли (source, url) схлопываем до самой ранней строки
+            cur.execute("""
+            DELETE FROM signals
+            WHERE source IS NOT NULL AND url IS NOT NULL
+              AND id NOT IN (
+                SELECT MIN(id) FROM signals
+                WHERE source IS NOT NULL AND url IS NOT NULL
+                GROUP BY source, url
+              );
+            """)
+            if cur.rowcount > 0:
+                print(f"NOTE: removed {cur.rowcount} duplicate (source, url) signals before creating idx_signals_source_url")
+            cur.execute("CREATE UNIQUE INDEX idx_signals_source_url ON signals(source, url);")
+            cur.execute("DROP INDEX IF EXISTS idx_signals_source_url_unique;")
+            conn.commit()
+        # частичный индекс для очереди analyze_signal: только неразмеченные,
+        # SQLite идёт по нему в порядке id DESC и останавливается на LIMIT
         cur.execute("""
-        CREATE UNIQUE INDEX IF NOT EXISTS idx_signals_source_url_unique
-        ON signals(source, url)
-        WHERE source IS NOT NULL AND source != ''
-          AND url IS NOT NULL AND url != '';
+        CREATE INDEX IF NOT EXISTS idx_signals_pending_rss
+        ON signals(source, id DESC)
+        WHERE rationale IS NULL OR rationale='';
         """)
+        # дашборд сортирует по ts DESC + LIMIT: без индекса это полный sort
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_signals_ts ON signals(ts DESC);")
         conn.commit()
+        _ensure_stats_counters(conn)
     finally:
         conn.close()
 
+# счётчики для signals_cli stats: total = строк с непустым url, uniq_url = различных
+# непустых url. Ведутся триггерами (любым писателем, не только storage), stats
+# читает две строки по PK вместо COUNT(DISTINCT url) по всей таблице
+_URL_SET = "{0}.url IS NOT NULL AND {0}.url != ''"
+_STATS_TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS signals_stats_ai AFTER INSERT ON signals
+    WHEN {_URL_SET.format("NEW")} BEGIN
+      UPDATE stats_counters SET value = value + 1 WHERE name = 'total';
+      UPDATE stats_counters SET value = value + 1 WHERE name = 'uniq_url'
+        AND NOT EXISTS (SELECT 1 FROM signals WHERE url = NEW.url AND id != NEW.id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS signals_stats_ad AFTER DELETE ON signals
+    WHEN {_URL_SET.format("OLD")} BEGIN
+      UPDATE stats_counters SET value = value - 1 WHERE name = 'total';
+      UPDATE stats_counters SET value = value - 1 WHERE name = 'uniq_url'
+        AND NOT EXISTS (SELECT 1 FROM signals WHERE url = OLD.url);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS signals_stats_au AFTER UPDATE OF url ON signals
+    WHEN OLD.url IS NOT NEW.url BEGIN
+      UPDATE stats_counters SET value = value - 1 WHERE name = 'total' AND {_URL_SET.format("OLD")};
+      UPDATE stats_counters SET value = value - 1 WHERE name = 'uniq_url' AND {_URL_SET.format("OLD")}
+        AND NOT EXISTS (SELECT 1 FROM signals WHERE url = OLD.url);
+      UPDATE stats_counters SET value = value + 1 WHERE name = 'total' AND {_URL_SET.format("NEW")};
+      UPDATE stats_counters SET value = value + 1 WHERE name = 'uniq_url' AND {_URL_SET.format("NEW")}
+        AND NOT EXISTS (SELECT 1 FROM signals WHERE url = NEW.url AND id != NEW.id);
+    END
+    """,
+)
+
+def _ensure_stats_counters(conn: sqlite3.Connection) -> None:
+    if conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='stats_counters'"
+    ).fetchone():
+        return
+    # засев полным проходом и триггеры — одной транзакцией: между ними никто не пишет
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("CREATE TABLE IF NOT EXISTS stats_counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        # триггеру uniq_url нужен поиск по url без source
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_signals_url ON signals(url)")
+        conn.execute(f"""
+            INSERT INTO stats_counters(name, value)
+            SELECT 'total', COUNT(*) FROM signals WHERE {_URL_SET.format("signals")}
+            UNION ALL
+            SELECT 'uniq_url', COUNT(DISTINCT url) FROM signals WHERE {_URL_SET.format("signals")}
+        """)
+        for sql in _STATS_TRIGGERS:
+            conn.execute(sql)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+# схема signals за время жизни процесса не меняется: PRAGMA table_info один раз на файл БД,
+# init_db сбрасывает кэш (после него колонки/индексы могли поменяться)
+_SCHEMA_CACHE: dict[str, tuple] = {}
+
+def _signals_schema(cur, db: str) -> tuple:
+    """(колонки без id, их множество) — всё, что от строки не зависит."""
+    schema = _SCHEMA_CACHE.get(db)
+    if schema is None:
+        cols = tuple(r[1] for r in cur.execute("PRAGMA table_info(signals)") if r[1] != "id")
+        schema = (cols, frozenset(cols))
+        if cols:  # таблицы ещё нет — не кэшируем пустую схему
+            _SCHEMA_CACHE[db] = schema
+    return schema
+
+# колонки signals из init_db. Если таблица ровно такая (обычный случай), строки
+# собираются напрямую в кортеж под один неизменный INSERT; иная схема (старые/чужие
+# БД) идёт через _prepare_row
+_SIGNALS_COLS = ("ts", "source", "origin", "title", "text", "url", "tags", "score", "color", "label", "rationale")
+_SIGNALS_COLSET = frozenset(_SIGNALS_COLS)
+
+def _prepare_stock_row(row: dict, batch_ts: str) -> tuple:
+    """_prepare_row для схемы init_db: те же значения, без промежуточного dict."""
+    get = row.get
+    base_ts = get("ts") or get("created_at") or batch_ts
+    base_source = (get("source") or "").strip()  # keep exact source, no fallback
+    if not base_source:
+        base_source = "atlas"
+    base_label = get("label") or get("project") or base_source
+
+    # None в row = значение не задано: берётся дефолт, как в _prepare_row
+    ts = get("ts")
+    source = get("source")
+    origin = get("origin")
+    title = get("title")
+    text = get("text")
+    url = get("url")
+    score = get("score")
+    color = get("color")
+    label = get("label")
+    return (
+        base_ts if ts is None else ts,
+        base_source if source is None else source,
+        base_source if origin is None else origin,
+        base_label if title is None else title,
+        "" if text is None else text,
+        None if url == "" else url,
+        get("tags"),
+        0.35 if score is None else score,
+        (get("level") or "neutral") if color is None else color,
+        base_label if label is None else label,
+        get("rationale"),
+    )
+
+def _prepare_row(row: dict, schema: tuple, batch_ts: str) -> tuple[tuple, list]:
+    """Строка signals -> (insert-колонки, значения) с дефолтами, без I/O.
+
+    None в row = значение не задано: остаётся дефолт, а колонка без дефолта не
+    попадает в INSERT (DEFAULT схемы или NULL). Затычек для NOT NULL нет: такая
+    ошибка в данных всплывает исключением. batch_ts — ts для строк без ts/created_at."""
+    cols, colset = schema
+    get = row.get
+
+    # базовые значения
+    base_ts = get("ts") or get("created_at") or batch_ts
+    base_source = (get("source") or "").strip()  # keep exact source, no fallback
+    if not base_source:
+        base_source = "atlas"
+
+    base_label = get("label") or get("project") or base_source
+    base_title = get("title") or base_label
+    base_text = get("text") or ""
+
+    # минимальные дефолты по наиболее частым полям; значения из row их перекрывают
+    vals = {
+        "ts": base_ts,
+        "created_at": base_ts,
+        "source": base_source,
+        "origin": get("origin") or base_source,
+        "project": get("project") or base_label,
+        "label": base_label,
+        "title": base_title,
+        "text": base_text,
+        "summary": get("summary") or (base_text or base_title),
+        "url": get("url") or None,
+        "kind": get("kind") or "event",
+        "horizon": get("horizon") or "T2",
+        "sentiment": get("sentiment") or "neutral",
+        "score": 0.35,
+        # color: строкой (у тебя в БД так и хранится)
+        "color": get("color") or get("level") or "neutral",
+        "level": get("level") or "neutral",
+    }
+    vals.update((k, v) for k, v in row.items() if v is not None)
+    if vals["url"] == "":
+        vals["url"] = None  # пустой url = нет url: вне UNIQUE(source, url)
+
+    # meta -> json
+    meta = vals.get("meta")
+    if meta is not None and "meta" in colset and not isinstance(meta, str):
+        vals["meta"] = dumps_json(meta)
+
+    insert_cols = tuple(c for c in cols if c in vals)
+    return insert_cols, [vals[c] for c in insert_cols]
+
+# текст INSERT по набору колонок строится один раз: одинаковая строка SQL
+# попадает в кэш подготовленных выражений sqlite3 и не парсится заново
+_INSERT_SQL: dict[tuple, str] = {}
+
+def _insert_sql(insert_cols: tuple) -> str:
+    sql = _INSERT_SQL.get(insert_cols)
+    if sql is None:
+        if not insert_cols:
+            raise RuntimeError("signals table: no matching columns to insert")
+        # ON CONFLICT DO NOTHING гасит только нарушения UNIQUE (дубль source+url и т.п.);
+        # NOT NULL / CHECK, которые OR IGNORE тоже молча проглатывал, теперь — исключение
+        sql = _INSERT_SQL[insert_cols] = "INSERT INTO signals ({}) VALUES ({}) ON CONFLICT DO NOTHING".format(
+            ",".join(insert_cols),
+            ",".join(["?"] * len(insert_cols)),
+        )
+    return sql
+
+# большие пачки одной формы: executemany во временную таблицу без индексов и
+# ограничений (temp_store=MEMORY — она в памяти), затем один INSERT ... SELECT в signals;
+# rowid-порядок сохраняет порядок вставки (и id) как у прямого executemany
+_STAGE_MIN_ROWS = 5000
+
+def _insert_staged(cur, insert_cols: tuple, values: list) -> int:
+    cols = ",".join(insert_cols)
+    cur.execute(f"CREATE TEMP TABLE signals_stage AS SELECT {cols} FROM main.signals WHERE 0")
+    cur.executemany(
+        "INSERT INTO temp.signals_stage VALUES ({})".format(",".join(["?"] * len(insert_cols))),
+        values,
+    )
+    cur.execute(
+        # WHERE true: без него парсер путает ON CONFLICT с ON от JOIN
+        f"INSERT INTO main.signals ({cols}) SELECT {cols} FROM temp.signals_stage WHERE true"
+        " ORDER BY rowid ON CONFLICT DO NOTHING"
+    )
+    inserted = cur.rowcount
+    cur.execute("DROP TABLE temp.signals_stage")
+    return inserted
+
 def save_signal(row: dict | None = None, **kwargs) -> int:
     """
-    Универсальный сохранитель сигнала.
+    Универсальный сохранитель сигнала (обёртка над save_signals_many).
     Возвращает: 1 если вставлено, 0 если проигнорировано (дубль/конфликт).
     """
     if row is None:
         row = {}
     if kwargs:
         row.update(kwargs)
+    return save_signals_many([row])
 
-    db = _atlas_db_path_v2()
-    conn = sqlite3.connect(db)
-    try:
+# вход читается кусками: память ограничена куском при любом N, транзакция одна на всё.
+# Кусок = порог staging: полный кусок одной формы идёт через _insert_staged
+_CHUNK_ROWS = _STAGE_MIN_ROWS
+
+def _chunks(rows: Iterable[dict], size: int = _CHUNK_ROWS):
+    it = iter(rows)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+def _save_signals_iter(rows: Iterable[dict], conn: sqlite3.Connection | None = None) -> tuple[int, int]:
+    """(прочитано строк, вставлено строк) для любого iterable, одной транзакцией.
+
+    conn — другое соединение (ingest fast_load, сборщики со своими таблицами),
+    по умолчанию общее. Если в conn уже открыта транзакция, строки пишутся в неё
+    через SAVEPOINT, а COMMIT остаётся за вызывающим."""
+    global _since_optimize
+    chunks = _chunks(rows)
+    first = next(chunks, None)
+    if first is None:
+        return 0, 0
+
+    with _CONN_LOCK:
+        if conn is None:
+            conn, db = _get_conn(), _atlas_db_path_v2()
+        else:
+            # кэш схемы — по файлу соединения: чужое соединение может смотреть в другую БД
+            db = conn.execute("PRAGMA database_list").fetchone()[2]
+        own_tx = not conn.in_transaction
         cur = conn.cursor()
+        schema = _signals_schema(cur, db)
+        stock = schema[1] == _SIGNALS_COLSET
 
-        info = cur.execute("PRAGMA table_info(signals)").fetchall()
-        cols = [r[1] for r in info]
-        notnull = {r[1]: r[3] for r in info}   # 1 if NOT NULL
-        dflt = {r[1]: r[4] for r in info}      # default value (SQL literal) or None
-
-        # базовые значения
-        base_ts = row.get("ts") or row.get("created_at") or datetime.now(timezone.utc).isoformat()
-        base_source = (row.get("source") or "").strip()  # keep exact source, no fallback
-        if not base_source:
-            base_source = "atlas"
-
-        base_label = row.get("label") or row.get("project") or base_source
-        base_title = row.get("title") or base_label
-        base_text = row.get("text") or ""
-        base_url = row.get("url") or ""
-
-        # meta -> json
-        if "meta" in cols and "meta" in row and not isinstance(row["meta"], str):
-            row["meta"] = json.dumps(row["meta"], ensure_ascii=False)
-
-        # минимальные дефолты по наиболее частым полям
-        defaults = {
-            "ts": base_ts,
-            "created_at": base_ts,
-            "source": base_source,
-            "origin": row.get("origin") or base_source,
-            "project": row.get("project") or base_label,
-            "label": base_label,
-            "title": base_title,
-            "text": base_text,
-            "summary": row.get("summary") or (base_text or base_title),
-            "url": base_url,
-            "kind": row.get("kind") or "event",
-            "horizon": row.get("horizon") or "T2",
-            "sentiment": row.get("sentiment") or "neutral",
-            "score": row.get("score") if row.get("score") is not None else 0.35,
-            # color: строкой (у тебя в БД так и хранится)
-            "color": row.get("color") or row.get("level") or "neutral",
-            "level": row.get("level") or "neutral",
-        }
-        for k, v in defaults.items():
-            if k in cols and k not in row:
-                row[k] = v
-
-        # если какие-то NOT NULL поля всё ещё пустые — затычки
-        for c in cols:
-            if c == "id":
-                continue
-            if notnull.get(c, 0) == 1 and (c not in row or row[c] is None):
-                if dflt.get(c) is not None:
-                    row[c] = str(dflt[c]).strip("'")
+        # одно datetime.now() на пачку, а не на каждую строку без ts
+        batch_ts = datetime.now(timezone.utc).isoformat()
+
+        # rowcount, не total_changes: тот считает и строки временной таблицы
+        seen = inserted = 0
+        cur.execute("BEGIN IMMEDIATE" if own_tx else "SAVEPOINT save_signals")
+        try:
+            for chunk in chain((first,), chunks):
+                seen += len(chunk)
+                if stock:
+                    batches = {_SIGNALS_COLS: list(map(_prepare_stock_row, chunk, repeat(batch_ts)))}
                 else:
-                    if c in ("ts", "created_at"):
-                        row[c] = base_ts
-                    elif c == "label":
-                        row[c] = base_label
-                    elif c == "source":
-                        row[c] = base_source
-                    elif c == "title":
-                        row[c] = base_title
-                    elif c in ("text", "summary", "url"):
-                        row[c] = ""
-                    elif c == "score":
-                        row[c] = 0.0
+                    # группируем по набору колонок, чтобы один SQL шёл в один executemany
+                    batches: dict[tuple, list] = {}
+                    for insert_cols, values in map(_prepare_row, chunk, repeat(schema), repeat(batch_ts)):
+                        batches.setdefault(insert_cols, []).append(values)
+
+                for insert_cols, values in batches.items():
+                    if len(values) >= _STAGE_MIN_ROWS:
+                        inserted += _insert_staged(cur, insert_cols, values)
                     else:
-                        row[c] = ""
+                        cur.executemany(_insert_sql(insert_cols), values)
+                        inserted += cur.rowcount
+            cur.execute("COMMIT" if own_tx else "RELEASE save_signals")
+        except BaseException:
+            if own_tx:
+                cur.execute("ROLLBACK")
+            else:
+                cur.execute("ROLLBACK TO save_signals")
+                cur.execute("RELEASE save_signals")
+            raise
 
-        insert_cols = [c for c in cols if c != "id" and c in row]
-        if not insert_cols:
-            raise RuntimeError("signals table: no matching columns to insert")
+        _since_optimize += inserted
+        # внутри чужой транзакции ANALYZE не запускаем: он растянул бы её
+        if own_tx and _since_optimize >= _OPTIMIZE_EVERY:
+            _optimize(conn)
+        return seen, inserted
 
-        sql = "INSERT OR IGNORE INTO signals ({}) VALUES ({})".format(
-            ",".join(insert_cols),
-            ",".join(["?"] * len(insert_cols)),
-        )
+def save_signals_many(rows: Iterable[dict], conn: sqlite3.Connection | None = None) -> int:
+    """
+    Пакетная версия save_signal: одно соединение, схема из кэша,
+    executemany кусками и один COMMIT на весь список (или любой iterable).
+    conn с открытой транзакцией — строки войдут в неё (COMMIT делает вызывающий).
+    Возвращает число реально вставленных строк.
+    """
+    return _save_signals_iter(rows, conn)[1]
 
-        cur.execute(sql, [row[c] for c in insert_cols])
-        conn.commit()
-        return 1 if cur.rowcount == 1 else 0
+def _ingest_in_memory(items: Iterable[dict], disk: sqlite3.Connection) -> tuple[int, int]:
+    """Загрузка целиком в :memory:, на диск — один последовательный backup() без WAL-трафика.
 
+    backup() заменяет файл целиком, поэтому схема (таблицы, индексы, триггеры,
+    счётчики) и всё прочее содержимое сначала копируется из файла в память тем же backup()."""
+    mem = sqlite3.connect(":memory:", isolation_level=None)
+    try:
+        disk.backup(mem)
+        counts = _save_signals_iter(items, mem)
+        mem.backup(disk)
+        return counts
     finally:
-        conn.close()
+        mem.close()
+
+def ingest(items: Iterable[dict], fast_load: bool = False) -> dict:
+    """Загрузить сигналы одной транзакцией, не держа их все в памяти: {"inserted": n, "ignored": m}.
+
+    fast_load — для первичной загрузки в пустую signals, когда больше никто не пишет:
+    строки копятся в :memory: и ложатся на диск одним backup(). Если в signals уже
+    есть строки, обычный путь (копия всей БД в память того не стоит)."""
+    with _CONN_LOCK:
+        disk = _get_conn()
+        if fast_load and disk.execute("SELECT 1 FROM signals LIMIT 1").fetchone() is None:
+            seen, inserted = _ingest_in_memory(items, disk)
+        else:
+            seen, inserted = _save_signals_iter(items)
+    return {"inserted": inserted, "ignored": seen - inserted}
 # --- /ATLAS V2 STORAGE PATCH ---
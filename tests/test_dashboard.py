@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("streamlit")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture(scope="module")
+def dashboard(tmp_path_factory):
+    import storage
+
+    # dashboard runs storage.init_db() on import: keep it off the repo's data/atlas.db,
+    # and put storage back afterwards for whatever test runs next
+    db = tmp_path_factory.mktemp("data") / "atlas.db"
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(storage, "DB_PATH", db)
+        mp.setattr(storage, "_DB_PATH_V2", str(db))
+        import dashboard
+
+        yield dashboard
+        sys.modules.pop("dashboard", None)  # its DB_PATH still points at the tmp file
+
+
+def test_card_ids_duplicate_labels(dashboard):
+    # normalize_columns can map two source columns onto one "id" label
+    df = pd.DataFrame([["", "a1", "u1"], ["7", "b2", None], [None, None, None]], columns=["id", "id", "uuid"])
+    assert dashboard.card_ids(df).tolist() == ["u1", "7", "3"]